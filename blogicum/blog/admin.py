@@ -1,6 +1,44 @@
-from django.contrib import admin
+from datetime import datetime, time, timedelta
 
-from .models import Category, Comment, Location, Post
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models import Q
+from django.utils.timezone import make_aware
+
+from .admin_filters import AuthorFilter, PostFilter
+from .forms import CommentActionForm, PostActionForm
+from .jobs import enqueue
+from .models import BackgroundJob, Category, Comment, Location, Post
+from .paginators import AdminPaginator
+from .search import search_posts
+
+
+def distinct_ids(queryset, field):
+    return list(
+        queryset.order_by().values_list(field, flat=True).distinct()
+    )
+
+
+def date_range(request):
+    """Границы периода из формы действия в виде ISO-строк, обе включительно."""
+    form = CommentActionForm(request.POST)
+    form.is_valid()
+    period = {}
+    for name, shift in (('since', 0), ('until', 1)):
+        day = form.cleaned_data.get(name)
+        if day:
+            period[name] = make_aware(datetime.combine(
+                day + timedelta(days=shift), time.min
+            )).isoformat()
+    return period
+
+
+def queued(model_admin, request, job):
+    model_admin.message_user(
+        request,
+        f'Задача #{job.pk} поставлена в очередь, ход выполнения — в '
+        'разделе «Фоновые задачи».'
+    )
 
 
 @admin.register(Category)
@@ -21,11 +59,97 @@ class Locationadmin(admin.ModelAdmin):
 class Postadmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'category', 'pub_date', 'is_published',)
     list_filter = ('category', 'is_published',)
+    list_select_related = ('author', 'category',)
     search_fields = ('title', 'text',)
+    paginator = AdminPaginator
+    show_full_result_count = False
+    action_form = PostActionForm
+    actions = ('unpublish_author_posts', 'reassign_category',)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_posts(queryset, search_term), False
+
+    @admin.action(description='Снять с публикации все посты их авторов')
+    def unpublish_author_posts(self, request, queryset):
+        queued(self, request, enqueue(
+            'unpublish_author_posts', author_ids=distinct_ids(
+                queryset, 'author_id'
+            )
+        ))
+
+    @admin.action(description='Перенести в выбранную категорию')
+    def reassign_category(self, request, queryset):
+        form = PostActionForm(request.POST)
+        form.is_valid()
+        category = form.cleaned_data.get('category')
+        if category is None:
+            self.message_user(
+                request, 'Выберите новую категорию.', messages.ERROR
+            )
+            return
+        queued(self, request, enqueue(
+            'reassign_category', category_id=category.pk,
+            post_ids=distinct_ids(queryset, 'pk')
+        ))
 
 
 @admin.register(Comment)
 class Commentadmin(admin.ModelAdmin):
     list_display = ('text', 'post', 'created_at', 'author',)
-    list_filter = ('text', 'post', 'created_at', 'author',)
-    search_fields = ('text', 'post', 'created_at', 'author',)
+    list_filter = (PostFilter, AuthorFilter,)
+    list_select_related = ('post', 'author',)
+    search_fields = ('=author__username',)
+    autocomplete_fields = ('post', 'author', 'parent',)
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at', '-id',)
+    paginator = AdminPaginator
+    show_full_result_count = False
+    action_form = CommentActionForm
+    actions = ('purge_author_comments', 'purge_comments_in_range',)
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(
+            Comment._meta.get_field('post'), self.admin_site
+        ).media
+
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по id комментария или публикации, иначе по логину автора.
+
+        Все три поиска идут по индексам; LIKE по тексту комментариев
+        просматривал бы всю таблицу.
+        """
+        term = search_term.strip()
+        if term.isdigit():
+            return queryset.filter(Q(pk=term) | Q(post_id=term)), False
+        return super().get_search_results(request, queryset, search_term)
+
+    @admin.action(description='Удалить все комментарии их авторов за период')
+    def purge_author_comments(self, request, queryset):
+        queued(self, request, enqueue(
+            'purge_comments',
+            author_ids=distinct_ids(queryset, 'author_id'),
+            **date_range(request)
+        ))
+
+    @admin.action(description='Удалить все комментарии за период')
+    def purge_comments_in_range(self, request, queryset):
+        period = date_range(request)
+        if not period:
+            self.message_user(
+                request, 'Укажите период удаления.', messages.ERROR
+            )
+            return
+        queued(self, request, enqueue('purge_comments', **period))
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'kind', 'status', 'progress', 'attempts', 'created_at',
+        'claimed_at', 'updated_at',
+    )
+    list_filter = ('status', 'kind',)
+    readonly_fields = ('error',)
@@ -0,0 +1,66 @@
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """Фильтр по внешнему ключу с виджетом автодополнения админки.
+
+    Варианты подгружаются по мере ввода через поиск админки связанной
+    модели, а боковая панель выбирает из базы только выбранный объект,
+    поэтому её построение не зависит от размера связанных таблиц.
+    """
+
+    template = 'admin/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = self.field_name
+        super().__init__(request, params, model, model_admin)
+        field = model._meta.get_field(self.field_name)
+        self.form_field = forms.ModelChoiceField(
+            field.remote_field.model._default_manager.all(),
+            required=False,
+            widget=AutocompleteSelect(field, model_admin.admin_site)
+        )
+
+    def lookups(self, request, model_admin):
+        return ((None, None),)
+
+    def selected_id(self):
+        value = self.value()
+        return value if value and value.isdigit() else None
+
+    def widget(self):
+        return self.form_field.widget.render(
+            self.parameter_name, self.selected_id(),
+            attrs={'onchange': 'this.form.submit()', 'style': 'width: 100%'}
+        )
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = [
+            (key, value)
+            for key, value in changelist.get_filters_params().items()
+            if key != self.parameter_name
+        ]
+        if changelist.query:
+            all_choice['query_parts'].append(('q', changelist.query))
+        yield all_choice
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        if self.selected_id() is None:
+            return queryset.none()
+        return queryset.filter(**{f'{self.field_name}_id': self.value()})
+
+
+class PostFilter(AutocompleteFilter):
+    title = 'публикации'
+    field_name = 'post'
+
+
+class AuthorFilter(AutocompleteFilter):
+    title = 'автору'
+    field_name = 'author'
@@ -5,3 +5,11 @@ class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        from django.conf import settings
+        from PIL import Image
+
+        from . import moderation, signals  # noqa: F401
+
+        Image.MAX_IMAGE_PIXELS = settings.MAX_IMAGE_PIXELS
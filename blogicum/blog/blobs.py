@@ -0,0 +1,127 @@
+"""Счётчики ссылок на файлы загруженных изображений.
+
+Один файл хранилища по хешу может принадлежать нескольким публикациям;
+он удаляется вместе со своими копиями, когда на него не остаётся ссылок.
+Запись файла, изменение счётчиков и решение об удалении принимаются под
+блокировкой строки StoredFile, поэтому загрузка, совпавшая по времени
+с освобождением того же файла, не останется без файла на диске.
+"""
+import os
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils.timezone import now
+
+from .images import derived_names
+from .models import StoredFile
+from .storage import CONTENT_ADDRESSED_NAME
+
+
+def _locked(name):
+    stored, _ = StoredFile.objects.select_for_update().get_or_create(
+        name=name
+    )
+    return stored
+
+
+def store_file(name, place):
+    """Кладёт файл на диск и учитывает его как ожидающую ссылку.
+
+    Ссылка ожидает, пока публикация с этим файлом не сохранится
+    (acquire_file с uploaded=True); до этого файл не удаляется.
+    """
+    with transaction.atomic():
+        stored = _locked(name)
+        place()
+        stored.pending += 1
+        stored.stored_at = now()
+        stored.save(update_fields=('pending', 'stored_at'))
+
+
+def acquire_file(name, uploaded=False):
+    with transaction.atomic():
+        stored = _locked(name)
+        stored.references += 1
+        if uploaded:
+            stored.pending = max(stored.pending - 1, 0)
+        stored.save(update_fields=('references', 'pending'))
+
+
+def release_file(storage, name):
+    with transaction.atomic():
+        stored = StoredFile.objects.select_for_update().filter(
+            name=name
+        ).first()
+        if stored is None:
+            return False
+        stored.references = max(stored.references - 1, 0)
+        stored.save(update_fields=('references',))
+        if stored.references or stored.pending:
+            return False
+        transaction.on_commit(lambda: delete_files(storage, name))
+    return True
+
+
+def delete_files(storage, name):
+    """Удаляет файл и копии, если на него по-прежнему нет ссылок."""
+    with transaction.atomic():
+        stored = StoredFile.objects.select_for_update().filter(
+            name=name
+        ).first()
+        if stored is None or stored.references or stored.pending:
+            return False
+        _delete_from_disk(storage, name)
+        stored.delete()
+    return True
+
+
+def _delete_from_disk(storage, name):
+    for file_name in (name, *derived_names(name)):
+        storage.delete(file_name)
+
+
+def collect_files(storage, grace_period):
+    """Подчищает файлы, которые так и не достались ни одной публикации.
+
+    Ожидающие ссылки старше grace_period сбрасываются (публикация не
+    сохранилась после загрузки), а файлы на диске без строки StoredFile
+    удаляются. Возвращает число удалённых файлов.
+    """
+    cutoff = now() - timedelta(seconds=grace_period)
+    StoredFile.objects.filter(
+        pending__gt=0, stored_at__lt=cutoff
+    ).update(pending=0)
+    deleted = sum(
+        delete_files(storage, name)
+        for name in list(StoredFile.objects.filter(
+            references=0, pending=0, stored_at__lt=cutoff
+        ).values_list('name', flat=True))
+    )
+    for names in _stored_names(storage, cutoff.timestamp()):
+        known = set(StoredFile.objects.filter(name__in=names).values_list(
+            'name', flat=True
+        ))
+        for name in set(names) - known:
+            with transaction.atomic():
+                _locked(name)
+                deleted += delete_files(storage, name)
+    return deleted
+
+
+def _stored_names(storage, modified_before, batch_size=500):
+    """Имена оригиналов на диске старше modified_before, пачками."""
+    names = []
+    for directory, _, files in os.walk(storage.location):
+        for file_name in files:
+            path = os.path.join(directory, file_name)
+            name = os.path.relpath(path, storage.location).replace('\\', '/')
+            match = CONTENT_ADDRESSED_NAME.search(name)
+            if match is None or match.group(2):
+                continue
+            if os.path.getmtime(path) < modified_before:
+                names.append(name)
+            if len(names) >= batch_size:
+                yield names
+                names = []
+    if names:
+        yield names
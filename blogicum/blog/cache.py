@@ -0,0 +1,261 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.timezone import now
+from django.views.decorators.http import condition
+
+from blog.constants import (
+    PAGE_CACHE_PARAMS, PAGE_CACHE_TTL, UPCOMING_PUBLICATIONS_LIMIT
+)
+from core.timing import record_cache
+
+GLOBAL_FEED = 'global'
+UPCOMING_PUBLICATIONS_KEY = 'blog:upcoming-publications'
+
+
+def cache_get(key):
+    value = cache.get(key)
+    record_cache(hits=int(value is not None), misses=int(value is None))
+    return value
+
+
+def cache_get_many(keys):
+    values = cache.get_many(keys)
+    record_cache(hits=len(values), misses=len(keys) - len(values))
+    return values
+
+
+def category_feed(category_id):
+    return f'category:{category_id}'
+
+
+def author_feed(author_id, own=False):
+    return f'author:{author_id}:{"own" if own else "public"}'
+
+
+def feed_count_key(feed):
+    return f'blog:feed-count:{feed}'
+
+
+def post_feeds(post):
+    """Ленты, где публикация видна сейчас или была видна до изменения."""
+    previous = getattr(post, '_loaded_values', {})
+    feeds = {GLOBAL_FEED}
+    for values in (previous, {'category_id': post.category_id,
+                              'author_id': post.author_id}):
+        if values.get('category_id'):
+            feeds.add(category_feed(values['category_id']))
+        if values.get('author_id'):
+            feeds.add(author_feed(values['author_id']))
+            feeds.add(author_feed(values['author_id'], own=True))
+    return feeds
+
+
+def affects_public_pages(post):
+    previous = getattr(post, '_loaded_values', {})
+    return post.is_published or previous.get('is_published', False)
+
+
+def invalidate_feed_counts(feeds):
+    cache.delete_many([feed_count_key(feed) for feed in feeds])
+
+
+def version_key(kind, pk):
+    return f'blog:version:{kind}:{pk}'
+
+
+def get_versions(keys):
+    """Возвращает версии по ключам, заводя новые для вытесненных из кеша."""
+    versions = cache_get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return versions
+
+
+def bump_version(kind, pk):
+    cache.set(version_key(kind, pk), time.time_ns(), timeout=None)
+
+
+def bump_versions(kind, pks):
+    stamp = time.time_ns()
+    cache.set_many(
+        {version_key(kind, pk): stamp for pk in pks}, timeout=None
+    )
+
+
+def post_card_version_keys(post):
+    return (
+        version_key('post', post.id),
+        version_key('category', post.category_id),
+        version_key('location', post.location_id),
+        version_key('user', post.author_id),
+    )
+
+
+def post_card_keys(posts):
+    version_keys = {
+        post.id: post_card_version_keys(post) for post in posts
+    }
+    versions = get_versions(
+        list({key for keys in version_keys.values() for key in keys})
+    )
+    return [
+        'blog:post-card:{}:{}:{}'.format(
+            post.id, post.comment_count,
+            ':'.join(str(versions[key]) for key in version_keys[post.id])
+        )
+        for post in posts
+    ]
+
+
+def upcoming_publications():
+    """Ближайшие отложенные публикации: (pub_date, category_id, author_id).
+
+    Хранит не больше UPCOMING_PUBLICATIONS_LIMIT строк; флаг truncated
+    означает, что за последней строкой есть ещё отложенные публикации.
+    """
+    index = cache_get(UPCOMING_PUBLICATIONS_KEY)
+    if index is None:
+        from blog.models import Post
+
+        rows = list(Post.objects.filter(
+            is_published=True, pub_date__gt=now()
+        ).order_by('pub_date').values_list(
+            'pub_date', 'category_id', 'author_id'
+        )[:UPCOMING_PUBLICATIONS_LIMIT + 1])
+        index = (
+            rows[:UPCOMING_PUBLICATIONS_LIMIT],
+            len(rows) > UPCOMING_PUBLICATIONS_LIMIT,
+        )
+        cache.set(UPCOMING_PUBLICATIONS_KEY, index, timeout=None)
+    return index
+
+
+def publication_feeds(category_id, author_id):
+    return {
+        GLOBAL_FEED,
+        category_feed(category_id),
+        author_feed(author_id),
+    }
+
+
+def next_publication(feed=GLOBAL_FEED):
+    """Время ближайшей отложенной публикации, меняющей ленту feed."""
+    current = now()
+    rows, truncated = upcoming_publications()
+    rows = [row for row in rows if row[0] > current]
+    if not rows and truncated:
+        cache.delete(UPCOMING_PUBLICATIONS_KEY)
+        rows, truncated = upcoming_publications()
+    for pub_date, category_id, author_id in rows:
+        if feed in publication_feeds(category_id, author_id):
+            return pub_date
+    if truncated:
+        return rows[-1][0]
+    return None
+
+
+def feed_cache_timeout(feed, timeout):
+    """Обрезает timeout до выхода ближайшей отложенной публикации ленты."""
+    if feed is None:
+        return timeout
+    upcoming = next_publication(feed)
+    if upcoming is None:
+        return timeout
+    return max(0, min(timeout, (upcoming - now()).total_seconds()))
+
+
+def page_cache_key(request, version_keys):
+    versions = get_versions(version_keys)
+    params = '&'.join(
+        f'{name}={request.GET[name]}'
+        for name in PAGE_CACHE_PARAMS if name in request.GET
+    )
+    digest = hashlib.md5(
+        f'{request.path}?{params}'.encode()
+    ).hexdigest()
+    return 'blog:page:{}:{}'.format(
+        digest, ':'.join(str(versions[key]) for key in version_keys)
+    )
+
+
+def cache_anonymous_page(get_version_keys, get_feed=None):
+    """Кеширует страницу для анонимных пользователей.
+
+    get_version_keys получает аргументы представления и возвращает ключи
+    версий, от которых зависит страница; сигналы увеличивают эти версии
+    при изменении публикаций, комментариев, категорий и местоположений.
+    get_feed возвращает ленту страницы: запись живёт не дольше, чем до
+    ближайшей отложенной публикации в этой ленте.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            key = page_cache_key(request, get_version_keys(*args, **kwargs))
+            cached = cache_get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            response = view(request, *args, **kwargs)
+            timeout = feed_cache_timeout(
+                get_feed(*args, **kwargs) if get_feed else None,
+                PAGE_CACHE_TTL
+            )
+            if (response.status_code == 200 and timeout
+                    and not response.cookies
+                    and not request.META.get('CSRF_COOKIE_USED')):
+                cache.set(
+                    key, (response.content, response['Content-Type']),
+                    timeout
+                )
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(get_version_keys, get_latest=None):
+    """Отдаёт ETag и Last-Modified страницы и отвечает 304 без её сборки.
+
+    Валидаторы строятся из версий страницы в кеше и, для лент, из даты
+    последней вышедшей публикации (get_latest), чтобы наступление
+    отложенной публикации тоже меняло страницу.
+    """
+
+    def validators(request, *args, **kwargs):
+        if not hasattr(request, '_page_validators'):
+            keys = get_version_keys(*args, **kwargs)
+            versions = get_versions(keys)
+            stamps = [
+                datetime.fromtimestamp(versions[key] / 1e9, tz=timezone.utc)
+                for key in keys
+            ]
+            latest = get_latest(*args, **kwargs) if get_latest else None
+            if latest:
+                stamps.append(latest)
+            last_modified = max(stamps)
+            etag = hashlib.md5('|'.join([
+                request.get_full_path(),
+                str(request.user.pk),
+                str(request.session.session_key),
+                *(str(versions[key]) for key in keys),
+                str(latest),
+            ]).encode()).hexdigest()
+            request._page_validators = (etag, last_modified)
+        return request._page_validators
+
+    return condition(
+        etag_func=lambda *args, **kwargs: validators(*args, **kwargs)[0],
+        last_modified_func=(
+            lambda *args, **kwargs: validators(*args, **kwargs)[1]
+        ),
+    )
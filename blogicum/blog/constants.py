@@ -1,3 +1,36 @@
 MAX_FIELD_LENGTH = 256
 REPRESANTATION_LENGHT = 20
 COUNT_POSTS = 10
+POST_ORDERING = ('-pub_date', '-id')
+RECOUNT_BATCH_SIZE = 1000
+FEED_COUNT_TTL = 60
+MAX_COUNTED_PAGES = 1000
+PAGE_LINKS_ON_EACH_SIDE = 2
+PAGE_LINKS_ON_ENDS = 1
+POST_CARD_TTL = 60 * 60 * 24
+PAGE_CACHE_TTL = 60 * 60
+PAGE_CACHE_PARAMS = (
+    'page', 'after', 'before', 'comments_after', 'thread'
+)
+UPCOMING_PUBLICATIONS_LIMIT = 100
+USER_PAGE_FIELDS = ('username', 'first_name', 'last_name', 'is_staff')
+COUNT_COMMENTS = 50
+COUNT_REPLIES = 10
+REPLY_ORDERING = ('path',)
+COMMENT_ORDERING = ('created_at', 'id')
+COMMENT_PATH_STEP = 10
+MAX_COMMENT_DEPTH = 5
+SEARCH_TABLE = 'blog_post_search'
+SEARCH_CONFIG = 'russian'
+SEARCH_INDEX_BATCH_SIZE = 500
+IMAGE_RENDITIONS = {'feed': 640, 'detail': 1280}
+IMAGE_RENDITION_SIZES = {
+    'feed': '(max-width: 640px) 100vw, 640px',
+    'detail': '(max-width: 1280px) 100vw, 1280px',
+}
+IMAGE_RENDITION_QUALITY = 80
+ORIGINAL_QUALITY = 95
+STORED_FILE_GRACE_PERIOD = 60 * 60
+ADMIN_COUNT_TTL = 60
+ADMIN_BOUNDARY_TTL = 60 * 5
+MODERATION_BATCH_SIZE = 500
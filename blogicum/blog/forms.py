@@ -1,12 +1,24 @@
 from django import forms
+from django.contrib.admin.helpers import ActionForm
 
-from .models import Post, Comment, User
+from .models import Category, Post, Comment, User
+from .uploads import validate_image_upload
+
+
+class LimitedImageField(forms.ImageField):
+    """Проверяет размер и пиксели загрузки до того, как её откроет Pillow."""
+
+    def to_python(self, data):
+        if data:
+            validate_image_upload(data)
+        return super().to_python(data)
 
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         exclude = ('author',)
+        field_classes = {'image': LimitedImageField}
         widgets = {
             'pub_date': forms.DateTimeInput(
                 format='%Y-%m-%d %H:%M', attrs={'type': 'datetime-local'}
@@ -24,3 +36,24 @@ class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class PostActionForm(ActionForm):
+    category = forms.ModelChoiceField(
+        Category.objects.all(),
+        required=False,
+        label='Новая категория'
+    )
+
+
+class CommentActionForm(ActionForm):
+    since = forms.DateField(
+        required=False,
+        label='С',
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+    until = forms.DateField(
+        required=False,
+        label='До',
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
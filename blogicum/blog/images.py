@@ -0,0 +1,209 @@
+"""Уменьшенные копии изображений публикаций.
+
+Для каждого размера из IMAGE_RENDITIONS рядом с оригиналом сохраняются
+WebP и запасной JPEG (PNG для картинок с прозрачностью); сведения о них
+хранятся в Post.image_meta. Обработка идёт в фоновой задаче post_image,
+до её завершения вместо изображения выводится заглушка.
+"""
+import os
+from functools import partial
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from blog.constants import (
+    IMAGE_RENDITION_QUALITY, IMAGE_RENDITION_SIZES, IMAGE_RENDITIONS,
+    ORIGINAL_QUALITY
+)
+from .jobs import enqueue, job_handler
+
+WEBP = ('WEBP', 'webp', 'image/webp')
+JPEG = ('JPEG', 'jpg', 'image/jpeg')
+PNG = ('PNG', 'png', 'image/png')
+
+EXIF_ORIENTATION = 0x0112
+TRANSPOSED = (5, 6, 7, 8)
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+
+
+def _resized(image, width):
+    if image.width <= width:
+        return image
+    height = max(round(image.height * width / image.width), 1)
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def _encode(image, image_format, alpha):
+    mode = 'RGBA' if alpha and image_format != 'JPEG' else 'RGB'
+    buffer = BytesIO()
+    image.convert(mode).save(
+        buffer, image_format, quality=IMAGE_RENDITION_QUALITY, optimize=True
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def _store_rendition(storage, name, encode):
+    """У файлов хранилища по хешу копии общие для всех публикаций."""
+    if not getattr(storage, 'content_addressed', False):
+        return storage.save(name, encode())
+    if not storage.exists(name):
+        storage.save_as(name, encode())
+    return name
+
+
+def derived_names(name):
+    root = os.path.splitext(name)[0]
+    return [
+        f'{root}_{kind}.{extension}'
+        for kind in IMAGE_RENDITIONS
+        for _, extension, _ in (WEBP, JPEG, PNG)
+    ]
+
+
+def build_renditions(image_file, source):
+    """Сохраняет копии изображения и возвращает их описание."""
+    alpha = _has_alpha(source)
+    root = os.path.splitext(image_file.name)[0]
+    renditions = []
+    for kind, width in IMAGE_RENDITIONS.items():
+        image = _resized(source, width)
+        for image_format, extension, mime in (WEBP, PNG if alpha else JPEG):
+            name = _store_rendition(
+                image_file.storage, f'{root}_{kind}.{extension}',
+                partial(_encode, image, image_format, alpha)
+            )
+            renditions.append({
+                'kind': kind, 'name': name, 'type': mime,
+                'width': image.width, 'height': image.height,
+            })
+    return renditions
+
+
+def strip_exif(image_file, source, image_format):
+    """Сохраняет оригинал повёрнутым и без EXIF, возвращает новое имя.
+
+    Прежний файл удаляется по счётчику ссылок, когда публикация
+    сохраняется с новым именем.
+    """
+    buffer = BytesIO()
+    source.save(buffer, image_format, quality=ORIGINAL_QUALITY)
+    name = image_file.storage.save(
+        image_file.name, ContentFile(buffer.getvalue())
+    )
+    image_file.instance._image_uploaded = True
+    return name
+
+
+def read_image_info(image_file):
+    """Размеры с учётом EXIF-поворота, байты и MIME без декодирования."""
+    with image_file.open('rb') as file:
+        with Image.open(file) as image:
+            width, height = image.size
+            if image.getexif().get(EXIF_ORIENTATION) in TRANSPOSED:
+                width, height = height, width
+            mime = Image.MIME.get(image.format)
+    return {
+        'width': width, 'height': height,
+        'size': image_file.size, 'type': mime,
+    }
+
+
+def process_image(image_file):
+    """Исправляет ориентацию оригинала и строит копии; возвращает meta."""
+    with image_file.open('rb') as file:
+        original = Image.open(file)
+        image_format = original.format
+        has_exif = bool(original.getexif())
+        source = ImageOps.exif_transpose(original)
+        source.load()
+    if has_exif:
+        image_file.name = strip_exif(image_file, source, image_format)
+    return {
+        'source': image_file.name,
+        'width': source.width,
+        'height': source.height,
+        'size': image_file.size,
+        'type': Image.MIME.get(image_format),
+        'renditions': build_renditions(image_file, source),
+    }
+
+
+def image_meta_is_stale(post):
+    return post.image_meta.get('source') != (post.image.name or None)
+
+
+def refresh_image_meta(post):
+    """Ставит обработку изображения в очередь, если оно сменилось.
+
+    Размеры, вес и MIME берутся из заголовка файла сразу, чтобы
+    карточки могли вывести width и height ещё до окончания обработки.
+    """
+    if not image_meta_is_stale(post):
+        return False
+    meta = {}
+    if post.image:
+        meta = {'source': post.image.name, 'pending': True}
+        try:
+            meta.update(read_image_info(post.image))
+        except (OSError, ValueError, Image.DecompressionBombError):
+            pass
+    post.image_meta = meta
+    type(post).objects.filter(pk=post.pk).update(image_meta=meta)
+    if post.image:
+        enqueue('post_image', post_id=post.pk, source=post.image.name)
+    return True
+
+
+@job_handler('post_image')
+def process_post_image(post_id, source):
+    from .models import Post
+
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or post.image.name != source:
+        return
+    try:
+        post.image_meta = process_image(post.image)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        meta = dict(post.image_meta, renditions=[])
+        meta.pop('pending', None)
+        post.image_meta = meta
+    post.save(update_fields=('image', 'image_meta', 'updated_at'))
+
+
+def _srcset(storage, renditions, mime):
+    widths = {}
+    for rendition in renditions:
+        if rendition['type'] == mime:
+            widths.setdefault(rendition['width'], rendition['name'])
+    return ', '.join(
+        f'{storage.url(name)} {width}w'
+        for width, name in sorted(widths.items())
+    )
+
+
+def picture_sources(post, kind):
+    """Адреса и размеры для <picture>: src запасного формата и srcset."""
+    meta = post.image_meta
+    dimensions = {'width': meta.get('width'), 'height': meta.get('height')}
+    if meta.get('pending'):
+        return {'pending': True, **dimensions}
+    renditions = meta.get('renditions', ())
+    fallback = next((
+        rendition for rendition in renditions
+        if rendition['kind'] == kind and rendition['type'] != WEBP[2]
+    ), None)
+    if fallback is None:
+        return {'src': post.image.url, **dimensions}
+    storage = post.image.storage
+    return {
+        'src': storage.url(fallback['name']),
+        'srcset': _srcset(storage, renditions, fallback['type']),
+        'webp_srcset': _srcset(storage, renditions, WEBP[2]),
+        'sizes': IMAGE_RENDITION_SIZES[kind],
+        'width': fallback['width'],
+        'height': fallback['height'],
+    }
@@ -0,0 +1,124 @@
+"""Очередь фоновых задач в таблице BackgroundJob.
+
+Обработчики регистрируются декоратором job_handler и вызываются
+командой run_jobs с параметрами задачи в виде именованных аргументов.
+Обработчик с atomic=False сам управляет транзакциями и может сообщать
+о ходе работы через report_progress.
+
+Взятая задача арендуется на JOB_LEASE_TIMEOUT секунд (claimed_at);
+report_progress продлевает аренду. Задачу с истёкшей арендой, например
+после падения воркера, claim_jobs возвращает в очередь как неудачную
+попытку, а результат опоздавшего воркера уже не записывается.
+"""
+import logging
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+current_job = ContextVar('current_job', default=None)
+
+
+def job_handler(kind, atomic=True):
+    def register(handler):
+        handler.atomic = atomic
+        HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+def report_progress(progress):
+    job = current_job.get()
+    if job is not None:
+        job.progress = progress
+        job.claimed_at = now()
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            progress=progress, claimed_at=job.claimed_at
+        )
+
+
+def enqueue(kind, **payload):
+    return BackgroundJob.objects.create(kind=kind, payload=payload)
+
+
+def requeue_expired_jobs():
+    """Возвращает в очередь задачи, чья аренда истекла."""
+    expired = BackgroundJob.objects.filter(
+        Q(claimed_at__lt=now() - timedelta(
+            seconds=settings.JOB_LEASE_TIMEOUT
+        )) | Q(claimed_at=None),
+        status=BackgroundJob.RUNNING,
+    )
+    error = 'Аренда задачи истекла: воркер не завершил её вовремя.'
+    expired.filter(attempts__gte=settings.JOB_MAX_ATTEMPTS - 1).update(
+        status=BackgroundJob.FAILED, attempts=F('attempts') + 1,
+        error=error
+    )
+    return expired.update(
+        status=BackgroundJob.PENDING, attempts=F('attempts') + 1,
+        error=error
+    )
+
+
+def claim_jobs(limit):
+    """Переводит до limit ожидающих задач в работу и возвращает их."""
+    requeue_expired_jobs()
+    candidates = BackgroundJob.objects.filter(
+        status=BackgroundJob.PENDING
+    ).order_by('id').values_list('id', flat=True)[:limit]
+    claimed = [
+        pk for pk in candidates
+        if BackgroundJob.objects.filter(
+            pk=pk, status=BackgroundJob.PENDING
+        ).update(status=BackgroundJob.RUNNING, claimed_at=now())
+    ]
+    return list(BackgroundJob.objects.filter(pk__in=claimed).order_by('id'))
+
+
+def run_job(job):
+    token = current_job.set(job)
+    try:
+        handler = HANDLERS[job.kind]
+        atomic = getattr(handler, 'atomic', True)
+        with transaction.atomic() if atomic else nullcontext():
+            handler(**job.payload)
+    except Exception as error:
+        logger.exception('Задача %s завершилась ошибкой', job)
+        job.attempts += 1
+        job.error = repr(error)
+        job.status = (
+            BackgroundJob.FAILED
+            if job.attempts >= settings.JOB_MAX_ATTEMPTS
+            else BackgroundJob.PENDING
+        )
+    else:
+        job.status = BackgroundJob.DONE
+        job.error = ''
+    finally:
+        current_job.reset(token)
+    BackgroundJob.objects.filter(
+        pk=job.pk, status=BackgroundJob.RUNNING, claimed_at=job.claimed_at
+    ).update(status=job.status, attempts=job.attempts, error=job.error)
+    return job.status
+
+
+def run_pending_jobs(limit=None):
+    """Выполняет ожидающие задачи в текущем потоке, пока они не кончатся."""
+    done = 0
+    while limit is None or done < limit:
+        jobs = claim_jobs(1)
+        if not jobs:
+            break
+        run_job(jobs[0])
+        done += 1
+    return done
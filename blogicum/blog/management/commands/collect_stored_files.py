@@ -0,0 +1,24 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from blog.blobs import collect_files
+from blog.constants import STORED_FILE_GRACE_PERIOD
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет загруженные файлы, которые так и не достались ни одной '
+        'публикации.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-period', type=int, default=STORED_FILE_GRACE_PERIOD,
+            help='Сколько секунд после загрузки файл не трогается.'
+        )
+
+    def handle(self, *args, grace_period, **options):
+        deleted = collect_files(default_storage, grace_period)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов: {deleted}'
+        ))
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.constants import SEARCH_INDEX_BATCH_SIZE, SEARCH_TABLE
+from blog.models import Post, SearchIndexState
+from blog.search import clear_index, fts_enabled, index_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Дозаполняет поисковый индекс публикаций пачками по id; '
+        'прерванная перестройка продолжается с последней пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=SEARCH_INDEX_BATCH_SIZE,
+            help='Количество публикаций, индексируемых за одну запись.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Очистить индекс и перестроить его с начала.'
+        )
+
+    def handle(self, *args, batch_size, restart, **options):
+        if not fts_enabled():
+            self.stdout.write(
+                'Индекс поддерживается базой данных, перестройка не нужна.'
+            )
+            return
+        state, _ = SearchIndexState.objects.get_or_create(name=SEARCH_TABLE)
+        if restart:
+            with transaction.atomic():
+                clear_index()
+                state.last_pk = 0
+                state.save(update_fields=('last_pk',))
+        indexed = 0
+        started = time.monotonic()
+        while True:
+            rows = list(
+                Post.objects.filter(pk__gt=state.last_pk).order_by(
+                    'pk'
+                ).values_list('pk', 'title', 'text')[:batch_size]
+            )
+            if not rows:
+                break
+            with transaction.atomic():
+                index_posts(rows)
+                state.last_pk = rows[-1][0]
+                state.save(update_fields=('last_pk',))
+            indexed += len(rows)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'Проиндексировано публикаций: {indexed} '
+                f'(до id {state.last_pk}, '
+                f'{indexed / max(elapsed, 1e-6):.0f} строк/с)'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен, добавлено публикаций: {indexed}'
+        ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+
+from blog.constants import RECOUNT_BATCH_SIZE
+from blog.models import Post
+from blog.services import actual_comment_count
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает разошедшиеся счётчики комментариев публикаций.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=RECOUNT_BATCH_SIZE,
+            help='Количество публикаций, проверяемых за один запрос.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        last_pk = 0
+        checked = fixed = 0
+        while True:
+            ids = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', flat=True
+                )[:batch_size]
+            )
+            if not ids:
+                break
+            last_pk = ids[-1]
+            checked += len(ids)
+            drifted = list(
+                Post.objects.filter(pk__in=ids).annotate(
+                    actual=Count('comments')
+                ).exclude(comment_count=F('actual')).values_list(
+                    'pk', flat=True
+                )
+            )
+            if drifted:
+                fixed += Post.objects.filter(pk__in=drifted).update(
+                    comment_count=actual_comment_count()
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено публикаций: {checked}, исправлено счётчиков: {fixed}'
+        ))
@@ -0,0 +1,61 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blog.jobs import claim_jobs, run_job
+
+
+def run_in_thread(job):
+    try:
+        return run_job(job)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=settings.JOB_WORKER_CONCURRENCY,
+            help='Количество задач, выполняемых одновременно.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.JOB_WORKER_POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выйти, как только очередь опустеет.'
+        )
+
+    def handle(self, *args, concurrency, poll_interval, once, **options):
+        concurrency = max(concurrency, 1)
+        pool = ThreadPoolExecutor(concurrency) if concurrency > 1 else None
+        processed = 0
+        try:
+            while True:
+                jobs = claim_jobs(concurrency)
+                if not jobs:
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                if pool is None:
+                    statuses = [run_job(job) for job in jobs]
+                else:
+                    statuses = list(pool.map(run_in_thread, jobs))
+                processed += len(jobs)
+                for job, status in zip(jobs, statuses):
+                    self.stdout.write(f'{job.kind} #{job.pk}: {status}')
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано задач: {processed}'
+        ))
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:28
+
+import core.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=core.models.UpdatedAtField(auto_now=True, db_index=True, verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=core.models.UpdatedAtField(auto_now=True, db_index=True, verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='updated_at',
+            field=core.models.UpdatedAtField(auto_now=True, db_index=True, verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=core.models.UpdatedAtField(auto_now=True, db_index=True, verbose_name='Изменено'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:30
+
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, LPad
+import django.db.models.deletion
+
+
+def fill_comment_path(apps, schema_editor):
+    Comment = apps.get_model('blog', 'Comment')
+    Comment.objects.filter(path='').update(
+        path=LPad(Cast('id', CharField()), 10, Value('0'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='blog.comment', verbose_name='Ответ на комментарий'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=50, verbose_name='Путь в ветке'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+        migrations.RunPython(fill_comment_path, migrations.RunPython.noop),
+    ]
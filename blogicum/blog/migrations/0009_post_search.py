@@ -0,0 +1,42 @@
+from django.db import migrations
+
+SEARCH_TABLE = 'blog_post_search'
+SEARCH_INDEX_NAME = 'post_search_idx'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} '
+            "USING fts5(title, text, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, title, text) '
+            'SELECT id, title, text FROM blog_post'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX {SEARCH_INDEX_NAME} ON blog_post USING gin '
+            "(to_tsvector('russian'::regconfig, "
+            "COALESCE(title, '') || ' ' || COALESCE(text, '')))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_comment_threads'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
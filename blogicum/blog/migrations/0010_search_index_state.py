@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256, unique=True, verbose_name='Индекс')),
+                ('last_pk', models.PositiveBigIntegerField(default=0, verbose_name='Последний проиндексированный id')),
+            ],
+            options={
+                'verbose_name': 'состояние поискового индекса',
+                'verbose_name_plural': 'Состояния поисковых индексов',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_search_index_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Сведения об изображении'),
+        ),
+    ]
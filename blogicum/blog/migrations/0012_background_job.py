@@ -0,0 +1,51 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:37
+
+import core.models
+from django.db import migrations, models
+
+
+def enqueue_existing_images(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    BackgroundJob = apps.get_model('blog', 'BackgroundJob')
+    posts = Post.objects.exclude(image='').values_list('id', 'image')
+    BackgroundJob.objects.bulk_create(
+        BackgroundJob(
+            kind='post_image', payload={'post_id': pk, 'source': image}
+        )
+        for pk, image in posts.iterator()
+    )
+    Post.objects.exclude(image='').update(image_meta={'pending': True})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_post_image_meta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Добавлено')),
+                ('updated_at', core.models.UpdatedAtField(auto_now=True, db_index=True, verbose_name='Изменено')),
+                ('kind', models.CharField(max_length=256, verbose_name='Тип')),
+                ('payload', models.JSONField(default=dict, verbose_name='Параметры')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Выполнена'), ('failed', 'Ошибка')], default='pending', max_length=16, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+            ],
+            options={
+                'verbose_name': 'фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='backgroundjob',
+            index=models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ),
+        migrations.RunPython(
+            enqueue_existing_images, migrations.RunPython.noop
+        ),
+    ]
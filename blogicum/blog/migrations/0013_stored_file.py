@@ -0,0 +1,38 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:40
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_references(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    StoredFile = apps.get_model('blog', 'StoredFile')
+    StoredFile.objects.bulk_create(
+        StoredFile(name=row['image'], references=row['references'])
+        for row in Post.objects.exclude(image='').values('image').annotate(
+            references=Count('id')
+        ).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_background_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256, unique=True, verbose_name='Файл')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+            ],
+            options={
+                'verbose_name': 'файл хранилища',
+                'verbose_name_plural': 'Файлы хранилища',
+            },
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
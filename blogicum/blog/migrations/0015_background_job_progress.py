@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_comment_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='progress',
+            field=models.PositiveIntegerField(default=0, verbose_name='Обработано строк'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_background_job_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedfile',
+            name='pending',
+            field=models.PositiveIntegerField(default=0, verbose_name='Ожидают сохранения'),
+        ),
+        migrations.AddField(
+            model_name='storedfile',
+            name='stored_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Загружен'),
+        ),
+    ]
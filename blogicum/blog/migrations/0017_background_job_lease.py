@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_stored_file_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взята в работу'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:08
+
+import blog.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_background_job_lease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchDocument',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='blog.post')),
+                ('title', models.TextField()),
+                ('text', models.TextField()),
+                ('document', blog.search.SearchDocumentField(db_column='blog_post_search')),
+            ],
+            options={
+                'db_table': 'blog_post_search',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_post_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='is_removed',
+            field=models.BooleanField(default=False, help_text='Удалённый комментарий с ответами остаётся в ветке заглушкой без текста.', verbose_name='Удалён автором'),
+        ),
+    ]
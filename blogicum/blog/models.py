@@ -1,8 +1,13 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils.timezone import now
 
 from core.models import CreatedAt, PublishedCreated
-from blog.constants import MAX_FIELD_LENGTH, REPRESANTATION_LENGHT
+from blog.constants import (
+    COMMENT_PATH_STEP, MAX_COMMENT_DEPTH, MAX_FIELD_LENGTH,
+    REPRESANTATION_LENGHT, SEARCH_TABLE
+)
+from blog.search import SearchDocumentField
 
 
 User = get_user_model()
@@ -52,6 +57,12 @@ class Post(PublishedCreated):
     )
     text = models.TextField(verbose_name='Текст')
     image = models.ImageField('Фото', upload_to='birthdays_images', blank=True)
+    image_meta = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Сведения об изображении'
+    )
     pub_date = models.DateTimeField(
         verbose_name='Дата и время публикации',
         help_text=(
@@ -78,15 +89,58 @@ class Post(PublishedCreated):
         verbose_name='Категория',
         related_name='posts',
     )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                condition=models.Q(is_published=True),
+                name='post_feed_idx',
+            ),
+            models.Index(
+                fields=('category', '-pub_date', '-id'),
+                condition=models.Q(is_published=True),
+                name='post_category_feed_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx',
+            ),
+        )
 
     def __str__(self):
         return self.title[:REPRESANTATION_LENGHT]
 
+    @property
+    def image_width(self):
+        return self.image_meta.get('width')
+
+    @property
+    def image_height(self):
+        return self.image_meta.get('height')
+
+    @property
+    def image_size(self):
+        return self.image_meta.get('size')
+
+    @property
+    def image_type(self):
+        return self.image_meta.get('type')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 
 class Comment(CreatedAt):
     text = models.TextField(verbose_name='Текст')
@@ -102,11 +156,178 @@ class Comment(CreatedAt):
         verbose_name='Автор комментария',
         related_name='comments'
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name='Ответ на комментарий',
+        related_name='replies'
+    )
+    path = models.CharField(
+        max_length=COMMENT_PATH_STEP * MAX_COMMENT_DEPTH,
+        blank=True,
+        editable=False,
+        verbose_name='Путь в ветке'
+    )
+    is_removed = models.BooleanField(
+        default=False,
+        verbose_name='Удалён автором',
+        help_text=(
+            'Удалённый комментарий с ответами остаётся в ветке '
+            'заглушкой без текста.'
+        )
+    )
 
     class Meta:
         ordering = ('created_at',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created_at', 'id'),
+                name='comment_post_created_idx',
+            ),
+            models.Index(
+                fields=('post', 'path'),
+                name='comment_post_path_idx',
+            ),
+            models.Index(
+                fields=('created_at', 'id'),
+                name='comment_created_idx',
+            ),
+        )
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарий'
 
     def __str__(self):
         return self.text[:REPRESANTATION_LENGHT]
+
+    @property
+    def depth(self):
+        return max(len(self.path) // COMMENT_PATH_STEP - 1, 0)
+
+    def save(self, *args, **kwargs):
+        if self.parent is not None and (
+                self.parent.depth >= MAX_COMMENT_DEPTH - 1):
+            self.parent = self.parent.parent
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            self.path = '{}{:0{}d}'.format(
+                self.parent.path if self.parent else '',
+                self.pk, COMMENT_PATH_STEP
+            )
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+
+class PostSearchDocument(models.Model):
+    """Строка индекса FTS5 на SQLite; таблицу ведёт blog.search."""
+
+    post = models.OneToOneField(
+        Post,
+        primary_key=True,
+        db_column='rowid',
+        on_delete=models.DO_NOTHING,
+        related_name='search_document'
+    )
+    title = models.TextField()
+    text = models.TextField()
+    document = SearchDocumentField(db_column=SEARCH_TABLE)
+
+    class Meta:
+        managed = False
+        db_table = SEARCH_TABLE
+
+
+class SearchIndexState(models.Model):
+    name = models.CharField(
+        max_length=MAX_FIELD_LENGTH,
+        unique=True,
+        verbose_name='Индекс'
+    )
+    last_pk = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Последний проиндексированный id'
+    )
+
+    class Meta:
+        verbose_name = 'состояние поискового индекса'
+        verbose_name_plural = 'Состояния поисковых индексов'
+
+    def __str__(self):
+        return f'{self.name}: {self.last_pk}'
+
+
+class BackgroundJob(CreatedAt):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    kind = models.CharField(max_length=MAX_FIELD_LENGTH, verbose_name='Тип')
+    payload = models.JSONField(default=dict, verbose_name='Параметры')
+    status = models.CharField(
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    progress = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Обработано строк'
+    )
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взята в работу'
+    )
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('status', 'id'),
+                name='job_status_idx',
+            ),
+        )
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk}: {self.status}'
+
+
+class StoredFile(models.Model):
+    name = models.CharField(
+        max_length=MAX_FIELD_LENGTH,
+        unique=True,
+        verbose_name='Файл'
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ссылок'
+    )
+    pending = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ожидают сохранения'
+    )
+    stored_at = models.DateTimeField(
+        default=now,
+        verbose_name='Загружен'
+    )
+
+    class Meta:
+        verbose_name = 'файл хранилища'
+        verbose_name_plural = 'Файлы хранилища'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
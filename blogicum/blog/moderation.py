@@ -0,0 +1,129 @@
+"""Массовая модерация пачками UPDATE и DELETE в фоновых задачах.
+
+Каждая пачка из MODERATION_BATCH_SIZE строк обрабатывается в своей
+транзакции, поэтому таблицы не блокируются надолго. Сигналы моделей при
+этом не срабатывают, и кеши со счётчиками обновляются здесь же.
+"""
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Value
+from django.db.models.functions import Concat
+
+from .cache import (
+    GLOBAL_FEED, UPCOMING_PUBLICATIONS_KEY, author_feed, bump_version,
+    bump_versions, category_feed, invalidate_feed_counts
+)
+from .constants import MODERATION_BATCH_SIZE
+from .jobs import job_handler, report_progress
+from .models import Comment, Post, User
+from .services import actual_comment_count
+from .signals import invalidate_post_comments
+
+
+def batches(queryset, batch_size=None):
+    batch_size = batch_size or MODERATION_BATCH_SIZE
+    last_pk = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', flat=True
+            )[:batch_size]
+        )
+        if not ids:
+            return
+        last_pk = ids[-1]
+        yield ids
+
+
+def invalidate_posts(rows, feeds=()):
+    """Сбрасывает кеши публикаций по строкам (id, category_id, author_id)."""
+    feeds = {GLOBAL_FEED, *feeds}
+    author_ids = set()
+    for _, category_id, author_id in rows:
+        author_ids.add(author_id)
+        feeds.add(author_feed(author_id))
+        feeds.add(author_feed(author_id, own=True))
+        if category_id:
+            feeds.add(category_feed(category_id))
+    invalidate_feed_counts(feeds)
+    bump_versions('post', [row[0] for row in rows])
+    bump_versions('profile', User.objects.filter(
+        pk__in=author_ids
+    ).values_list('username', flat=True))
+    bump_version('feed', GLOBAL_FEED)
+    cache.delete(UPCOMING_PUBLICATIONS_KEY)
+
+
+def update_posts(queryset, feeds=(), **values):
+    done = 0
+    for ids in batches(queryset):
+        with transaction.atomic():
+            posts = Post.objects.filter(pk__in=ids)
+            rows = list(posts.values_list('id', 'category_id', 'author_id'))
+            posts.update(**values)
+        invalidate_posts(rows, feeds)
+        done += len(ids)
+        report_progress(done)
+    return done
+
+
+@job_handler('unpublish_author_posts', atomic=False)
+def unpublish_author_posts(author_ids):
+    return update_posts(
+        Post.objects.filter(author_id__in=author_ids, is_published=True),
+        is_published=False
+    )
+
+
+@job_handler('reassign_category', atomic=False)
+def reassign_category(post_ids, category_id):
+    return update_posts(
+        Post.objects.filter(pk__in=post_ids).exclude(
+            category_id=category_id
+        ),
+        feeds=(category_feed(category_id),),
+        category_id=category_id
+    )
+
+
+def with_replies(ids, post_ids):
+    """Комментарии ids вместе с ветками ответов, выбранными по path."""
+    return Comment.objects.filter(post_id__in=post_ids).filter(Exists(
+        Comment.objects.filter(
+            pk__in=ids, post_id=OuterRef('post_id'),
+            path__lte=OuterRef('path')
+        ).annotate(
+            path_end=Concat('path', Value(':'))
+        ).filter(path_end__gt=OuterRef('path'))
+    ))
+
+
+@job_handler('purge_comments', atomic=False)
+def purge_comments(author_ids=None, since=None, until=None):
+    comments = Comment.objects.all()
+    if author_ids is not None:
+        comments = comments.filter(author_id__in=author_ids)
+    if since:
+        comments = comments.filter(created_at__gte=datetime.fromisoformat(
+            since
+        ))
+    if until:
+        comments = comments.filter(created_at__lt=datetime.fromisoformat(
+            until
+        ))
+    done = 0
+    for ids in batches(comments):
+        with transaction.atomic():
+            post_ids = set(Comment.objects.filter(pk__in=ids).values_list(
+                'post_id', flat=True
+            ))
+            doomed = with_replies(ids, post_ids)
+            done += doomed._raw_delete(doomed.db)
+            Post.objects.filter(pk__in=post_ids).update(
+                comment_count=actual_comment_count()
+            )
+        invalidate_post_comments(post_ids)
+        report_progress(done)
+    return done
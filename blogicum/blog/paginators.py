@@ -0,0 +1,372 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import (
+    EmptyResultSet, FieldDoesNotExist, ValidationError
+)
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.encoding import force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from blog.cache import cache_get, feed_cache_timeout, feed_count_key
+from blog.constants import (
+    ADMIN_BOUNDARY_TTL, ADMIN_COUNT_TTL, FEED_COUNT_TTL, MAX_COUNTED_PAGES,
+    PAGE_LINKS_ON_EACH_SIDE, PAGE_LINKS_ON_ENDS, POST_ORDERING
+)
+
+
+def _field_names(ordering):
+    return [field.lstrip('-') for field in ordering]
+
+
+def encode_cursor(obj, ordering):
+    values = [getattr(obj, name) for name in _field_names(ordering)]
+    payload = json.dumps(
+        [value.isoformat() if hasattr(value, 'isoformat') else value
+         for value in values]
+    )
+    return urlsafe_base64_encode(payload.encode())
+
+
+def decode_cursor(token, model, ordering):
+    """Возвращает значения полей сортировки или None для битого курсора.
+
+    Поля сортировки не допускают NULL, поэтому курсор с null тоже битый.
+    """
+    try:
+        values = json.loads(force_str(urlsafe_base64_decode(token)))
+        names = _field_names(ordering)
+        if (not isinstance(values, list) or len(values) != len(names)
+                or None in values):
+            return None
+        return [
+            model._meta.get_field(name).to_python(value)
+            for name, value in zip(names, values)
+        ]
+    except (TypeError, ValueError, ValidationError):
+        return None
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """Строит условие «строго после» ключа в лексикографическом порядке."""
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != reverse
+        lookup = 'lt' if descending else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _reverse_ordering(ordering):
+    return [
+        field[1:] if field.startswith('-') else f'-{field}'
+        for field in ordering
+    ]
+
+
+class CursorPage(Page):
+    """Страница с номером, дополнительно умеющая отдавать курсоры."""
+
+    def has_next(self):
+        if self.paginator.count_capped and self.object_list:
+            return True
+        return super().has_next()
+
+    @property
+    def elided_page_range(self):
+        return self.paginator.get_elided_page_range(
+            self.number,
+            on_each_side=PAGE_LINKS_ON_EACH_SIDE,
+            on_ends=PAGE_LINKS_ON_ENDS,
+        )
+
+    @property
+    def next_cursor(self):
+        if self.has_next() and self.object_list:
+            return encode_cursor(
+                self.object_list[len(self.object_list) - 1],
+                self.paginator.ordering
+            )
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.object_list:
+            return encode_cursor(self.object_list[0], self.paginator.ordering)
+
+
+class PostPaginator(Paginator):
+    """Пагинатор ленты с кешируемым и ограниченным сверху COUNT(*).
+
+    Для ленты с ключом feed число публикаций берётся из кеша; при промахе
+    считается не больше MAX_COUNTED_PAGES страниц, а сверх этого лента
+    помечается как неточно посчитанная (count_capped).
+    """
+
+    def __init__(self, object_list, per_page, ordering=POST_ORDERING,
+                 feed=None, **kwargs):
+        self.ordering = ordering
+        self.feed = feed
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def _count_info(self):
+        if self.feed is None:
+            return Paginator.count.func(self), False
+        key = feed_count_key(self.feed)
+        info = cache_get(key)
+        if info is None:
+            info = self._capped_count()
+            cache.set(
+                key, info, feed_cache_timeout(self.feed, FEED_COUNT_TTL)
+            )
+        return info
+
+    def _capped_count(self):
+        limit = self.per_page * MAX_COUNTED_PAGES
+        count = self.object_list.order_by().values('pk')[:limit + 1].count()
+        if count > limit:
+            return limit, True
+        return count, False
+
+    @property
+    def count(self):
+        return self._count_info[0]
+
+    @property
+    def count_capped(self):
+        return self._count_info[1]
+
+    def _get_page(self, *args, **kwargs):
+        return CursorPage(*args, **kwargs)
+
+
+class KeysetPage:
+    """Страница курсорной пагинации с интерфейсом Page для шаблонов."""
+
+    number = None
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Keyset page of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next() and self.object_list:
+            return encode_cursor(
+                self.object_list[-1], self.paginator.ordering
+            )
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.object_list:
+            return encode_cursor(self.object_list[0], self.paginator.ordering)
+
+
+class KeysetPaginator:
+    """Пагинация по ключу сортировки без OFFSET и COUNT(*).
+
+    Стоимость запроса страницы не зависит от её глубины: выбирается
+    per_page + 1 строк строго после (или до) ключа из курсора.
+    """
+
+    def __init__(self, object_list, per_page, ordering=POST_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    def get_page(self, after=None, before=None):
+        model = self.object_list.model
+        if before:
+            values = decode_cursor(before, model, self.ordering)
+            if values is not None:
+                return self._page_before(values)
+        values = decode_cursor(after, model, self.ordering) if after else None
+        return self._page_after(values)
+
+    def _page_after(self, values):
+        queryset = self.object_list.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(self.ordering, values))
+        items = list(queryset[:self.per_page + 1])
+        return KeysetPage(
+            items[:self.per_page], self,
+            has_next=len(items) > self.per_page,
+            has_previous=values is not None,
+        )
+
+    def _page_before(self, values):
+        queryset = self.object_list.order_by(
+            *_reverse_ordering(self.ordering)
+        ).filter(keyset_filter(self.ordering, values, reverse=True))
+        items = list(queryset[:self.per_page + 1])
+        return KeysetPage(
+            items[:self.per_page][::-1], self,
+            has_next=True,
+            has_previous=len(items) > self.per_page,
+        )
+
+
+def estimated_table_rows(model):
+    """Оценка числа строк таблицы из статистики PostgreSQL или None."""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE relname = %s',
+            (model._meta.db_table,)
+        )
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] > 0 else None
+
+
+class AdminPaginator(Paginator):
+    """Пагинатор списков админки без полного COUNT(*) и глубокого OFFSET.
+
+    Число строк кешируется по тексту запроса и считается не дальше
+    MAX_COUNTED_PAGES страниц (без фильтров на PostgreSQL берётся оценка
+    из pg_class). Такое число помечается как приблизительное, и страницы
+    за ним открываются, пока в них есть строки: ссылки ведут на одну
+    страницу дальше текущей. Ключ последней строки каждой страницы
+    запоминается, и следующая страница выбирается по нему без OFFSET;
+    при переходе на произвольную страницу OFFSET идёт только по первичным
+    ключам, а строки догружаются отдельным запросом.
+    """
+
+    @cached_property
+    def _query_key(self):
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except EmptyResultSet:
+            return None
+        return hashlib.md5(f'{sql}{params!r}'.encode()).hexdigest()
+
+    @cached_property
+    def count(self):
+        if self._query_key is None:
+            return 0
+        key = f'blog:admin-count:{self._query_key}'
+        count = cache_get(key)
+        if count is None:
+            count = self._estimated_count()
+            cache.set(key, count, ADMIN_COUNT_TTL)
+        return count
+
+    @property
+    def counted_limit(self):
+        return self.per_page * MAX_COUNTED_PAGES
+
+    @property
+    def count_is_approximate(self):
+        return self.count > self.counted_limit
+
+    @property
+    def num_pages(self):
+        pages = super().num_pages
+        if self.count_is_approximate:
+            return max(pages, getattr(self, '_requested', 0) + 1)
+        return pages
+
+    def validate_number(self, number):
+        if not self.count_is_approximate:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return super().validate_number(number)
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        self._requested = number
+        return number
+
+    def _estimated_count(self):
+        limit = self.counted_limit
+        if not self.object_list.query.where:
+            estimate = estimated_table_rows(self.object_list.model)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return self.object_list.order_by().values('pk')[:limit + 1].count()
+
+    @cached_property
+    def ordering(self):
+        """Поля сортировки, если по ним можно листать по ключу."""
+        opts = self.object_list.model._meta
+        ordering = []
+        for field in self.object_list.query.order_by:
+            if not isinstance(field, str):
+                return None
+            name = field.lstrip('-')
+            name = opts.pk.name if name == 'pk' else name
+            try:
+                model_field = opts.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if model_field.is_relation or not model_field.concrete:
+                return None
+            ordering.append(f'-{name}' if field.startswith('-') else name)
+        if opts.pk.name not in _field_names(ordering):
+            return None
+        return tuple(ordering)
+
+    def _boundary_key(self, number):
+        return f'blog:admin-page:{self._query_key}:{self.per_page}:{number}'
+
+    def page(self, number):
+        number = self.validate_number(number)
+        boundary = None
+        if self.ordering and number > 1:
+            boundary = cache_get(self._boundary_key(number))
+        if boundary is not None:
+            rows = list(self.object_list.filter(
+                keyset_filter(self.ordering, boundary)
+            )[:self.per_page])
+        else:
+            rows = self._deferred_page(number)
+        if not rows and number > 1:
+            raise EmptyPage('На странице нет строк')
+        if rows and self.ordering:
+            cache.set(
+                self._boundary_key(number + 1),
+                [getattr(rows[-1], name) for name in _field_names(
+                    self.ordering
+                )],
+                ADMIN_BOUNDARY_TTL
+            )
+        return self._get_page(rows, number, self)
+
+    def _deferred_page(self, number):
+        bottom = (number - 1) * self.per_page
+        ids = list(self.object_list.values_list('pk', flat=True)[
+            bottom:bottom + self.per_page
+        ])
+        rows = {row.pk: row for row in self.object_list.filter(pk__in=ids)}
+        return [rows[pk] for pk in ids if pk in rows]
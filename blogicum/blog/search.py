@@ -0,0 +1,117 @@
+"""Полнотекстовый поиск по публикациям.
+
+На SQLite индекс — виртуальная таблица FTS5, которую синхронизируют
+сигналы публикаций; на PostgreSQL — GIN-индекс по выражению tsvector,
+который база поддерживает сама. Оба создаёт миграция 0009.
+"""
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Lookup, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+
+from blog.constants import SEARCH_CONFIG, SEARCH_TABLE
+
+
+class SearchDocumentField(TextField):
+    """Скрытый столбец FTS5 с именем таблицы: по нему идёт MATCH."""
+
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def postgres_enabled():
+    return connection.vendor == 'postgresql'
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query or '')
+
+
+def post_search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return SearchVector('title', 'text', config=SEARCH_CONFIG)
+
+
+def index_posts(rows):
+    """Записывает в индекс строки (id, title, text) одним запросом."""
+    if not fts_enabled() or not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE}(rowid, title, text) '
+            'VALUES (%s, %s, %s)',
+            rows
+        )
+
+
+def unindex_posts(ids):
+    if not fts_enabled() or not ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in ids]
+        )
+
+
+def clear_index():
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+
+def search_posts(queryset, query):
+    """Оставляет в queryset публикации, подходящие под запрос.
+
+    Результат размечен полем search_rank (меньше — релевантнее) и
+    упорядочен по нему.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    if postgres_enabled():
+        return _search_postgres(queryset, ' '.join(terms))
+    if fts_enabled():
+        return _search_fts(queryset, terms)
+    for term in terms:
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(text__icontains=term)
+        )
+    return queryset.annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    ).order_by('-pub_date', '-id')
+
+
+def _search_fts(queryset, terms):
+    """Один JOIN с таблицей FTS5: MATCH и bm25() считаются за проход."""
+    match = ' '.join('"{}"'.format(term) for term in terms)
+    return queryset.filter(search_document__document__match=match).annotate(
+        search_rank=RawSQL(
+            f'bm25("{SEARCH_TABLE}")', (), output_field=FloatField()
+        )
+    ).order_by('search_rank', '-pub_date', '-id')
+
+
+def _search_postgres(queryset, query):
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG)
+    return queryset.annotate(search=post_search_vector()).filter(
+        search=search_query
+    ).annotate(
+        search_rank=-SearchRank(F('search'), search_query)
+    ).order_by('search_rank', '-pub_date', '-id')
@@ -1,9 +1,18 @@
-from django.db.models import Count
-from django.utils.timezone import now
+from functools import reduce
+from operator import or_
+
 from django.core.paginator import Paginator
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
+from django.utils.timezone import now
 
-from blog.constants import COUNT_POSTS
-from .models import Post
+from blog.constants import (
+    COMMENT_ORDERING, COMMENT_PATH_STEP, COUNT_COMMENTS, COUNT_POSTS,
+    COUNT_REPLIES, POST_ORDERING, REPLY_ORDERING
+)
+from .models import Comment, Post
+from .paginators import KeysetPaginator, PostPaginator, encode_cursor
+from .search import search_posts
 
 
 def filter_by_date(manager=Post.objects):
@@ -14,15 +23,135 @@ def filter_by_date(manager=Post.objects):
     )
 
 
-def annotate_with_comments(manager=Post.objects):
-    return manager.annotate(
-        comment_count=Count('comments')).select_related(
+def is_visible(post):
+    return (
+        post.is_published
+        and post.pub_date < now()
+        and post.category is not None
+        and post.category.is_published
+    )
+
+
+def select_post_relations(manager=Post.objects):
+    return manager.select_related(
         'author', 'category', 'location').order_by(
-        '-pub_date'
+        *POST_ORDERING
     )
 
 
-def post_paginator(request, item, num=COUNT_POSTS):
-    paginator = Paginator(item, num)
+def post_paginator(request, item, num=COUNT_POSTS, feed=None):
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before:
+        return KeysetPaginator(item, num).get_page(after=after, before=before)
+    paginator = PostPaginator(item, num, feed=feed)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def search_paginator(request, query, num=COUNT_POSTS):
+    posts = search_posts(
+        select_post_relations(filter_by_date(Post.objects)), query
+    )
+    return Paginator(posts, num).get_page(request.GET.get('page'))
+
+
+def root_path(root_id):
+    return '{:0{}d}'.format(root_id, COMMENT_PATH_STEP)
+
+
+def thread_range(path):
+    """Ответы ветки: пути длиннее корневого и меньше его с ':'."""
+    if isinstance(path, str):
+        return Q(path__gt=path, path__lt=f'{path}:')
+    return Q(path__gt=path, path__lt=Concat(path, Value(':')))
+
+
+def comment_paginator(post, after=None):
+    """Страница веток: корневые комментарии по курсору и начала веток.
+
+    Для каждого корня подзапросом по индексу (post, path) находится путь
+    ответа, следующего за первыми COUNT_REPLIES. Ответы страницы
+    выбираются одним запросом по диапазонам путей и складываются в
+    атрибут thread корней, остальное подгружается thread_paginator.
+    Если ответов на странице нет, этот запрос не выполняется.
+    """
+    replies = Comment.objects.filter(
+        thread_range(OuterRef('path')), post=OuterRef('post')
+    ).order_by(*REPLY_ORDERING)
+    page = KeysetPaginator(
+        post.comments.filter(parent=None).select_related('author').annotate(
+            has_replies=Exists(replies),
+            replies_end=Subquery(
+                replies.values('path')[COUNT_REPLIES:COUNT_REPLIES + 1]
+            ),
+        ),
+        COUNT_COMMENTS,
+        ordering=COMMENT_ORDERING,
+    ).get_page(after=after)
+    for root in page:
+        root.thread = []
+    roots = {root.path: root for root in page if root.has_replies}
+    if not roots:
+        return page
+    ranges = [
+        thread_range(path) & Q(path__lt=root.replies_end)
+        if root.replies_end else thread_range(path)
+        for path, root in roots.items()
+    ]
+    replies = post.comments.filter(reduce(or_, ranges)).select_related(
+        'author'
+    ).order_by(*REPLY_ORDERING)
+    for reply in replies:
+        roots[reply.path[:COMMENT_PATH_STEP]].thread.append(reply)
+    for root in roots.values():
+        if root.replies_end and root.thread:
+            root.replies_cursor = encode_cursor(
+                root.thread[-1], REPLY_ORDERING
+            )
+    return page
+
+
+def thread_paginator(post, root_id, after=None):
+    """Продолжение ветки: ответы корня по курсору в порядке дерева."""
+    return KeysetPaginator(
+        post.comments.filter(
+            thread_range(root_path(root_id))
+        ).select_related('author'),
+        COUNT_REPLIES,
+        ordering=REPLY_ORDERING,
+    ).get_page(after=after)
+
+
+def actual_comment_count():
+    return Coalesce(Subquery(
+        Comment.objects.filter(
+            post=OuterRef('pk'), is_removed=False
+        ).order_by().values(
+            'post').annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def remove_comment(comment):
+    """Удаляет комментарий автора, не трогая чужие ответы на него.
+
+    Комментарий с ответами остаётся в ветке заглушкой без текста.
+    Заглушки, у которых не осталось ответов, удаляются следом.
+    """
+    if comment.replies.exists():
+        comment.is_removed = True
+        comment.text = ''
+        comment.save(update_fields=('is_removed', 'text'))
+        return
+    parent = comment.parent
+    comment.delete()
+    while (parent is not None and parent.is_removed
+           and not parent.replies.exists()):
+        comment, parent = parent, parent.parent
+        comment.delete()
+
+
+def latest_publication(manager=Post.objects):
+    return filter_by_date(manager).order_by('-pub_date').values_list(
+        'pub_date', flat=True
+    ).first()
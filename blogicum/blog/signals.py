@@ -0,0 +1,214 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from .cache import (
+    GLOBAL_FEED, UPCOMING_PUBLICATIONS_KEY, affects_public_pages,
+    bump_version, bump_versions, category_feed, invalidate_feed_counts,
+    post_feeds
+)
+from .constants import USER_PAGE_FIELDS
+from .blobs import acquire_file, release_file
+from .images import refresh_image_meta
+from .models import Category, Comment, Location, Post, User
+from .search import index_posts, unindex_posts
+
+
+def change_comment_count(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comment_count__gte=-delta)
+    posts.update(comment_count=F('comment_count') + delta)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_post(sender, instance, **kwargs):
+    instance._previous_post_id = None
+    instance._was_removed = False
+    if not instance._state.adding:
+        instance._previous_post_id, instance._was_removed = (
+            Comment.objects.filter(pk=instance.pk).values_list(
+                'post_id', 'is_removed'
+            ).first() or (None, False)
+        )
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    """Заглушки удалённых комментариев в счётчик не входят."""
+    if created:
+        change_comment_count(instance.post_id, 1)
+        return
+    if instance.is_removed != instance._was_removed:
+        change_comment_count(
+            instance.post_id, -1 if instance.is_removed else 1
+        )
+    if (instance._previous_post_id not in (None, instance.post_id)
+            and not instance.is_removed):
+        change_comment_count(instance._previous_post_id, -1)
+        change_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    if not instance.is_removed:
+        change_comment_count(instance.post_id, -1)
+
+
+def invalidate_post_comments(post_ids):
+    """Сбрасывает страницы с комментариями и счётчиками публикаций.
+
+    Общая лента не сбрасывается: карточка в ней обновится по счётчику
+    комментариев в своём ключе, когда истечёт кеш страницы.
+    """
+    bump_versions('comments', post_ids)
+    rows = Post.objects.filter(pk__in=post_ids).values_list(
+        'author__username', 'category__slug', 'is_published',
+        'category__is_published', 'pub_date'
+    )
+    usernames, slugs = set(), set()
+    moment = now()
+    for username, slug, is_published, category_is_published, pub_date in (
+            rows):
+        usernames.add(username)
+        if is_published and category_is_published and pub_date < moment:
+            slugs.add(slug)
+    bump_versions('profile', usernames)
+    bump_versions('category-page', slugs)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    post_ids = {
+        instance.post_id, getattr(instance, '_previous_post_id', None)
+    }
+    invalidate_post_comments(post_ids - {None})
+
+
+def invalidate_catalog():
+    bump_version('catalog', GLOBAL_FEED)
+    bump_version('feed', GLOBAL_FEED)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    invalidate_feed_counts(post_feeds(instance))
+    bump_version('post', instance.id)
+    author_ids = {
+        instance.author_id,
+        getattr(instance, '_loaded_values', {}).get('author_id'),
+    }
+    for username in User.objects.filter(pk__in=author_ids).values_list(
+        'username', flat=True
+    ):
+        bump_version('profile', username)
+    if affects_public_pages(instance):
+        bump_version('feed', GLOBAL_FEED)
+        cache.delete(UPCOMING_PUBLICATIONS_KEY)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'title', 'text'} & set(update_fields):
+        index_posts([(instance.id, instance.title, instance.text)])
+
+
+@receiver(pre_save, sender=Post)
+def remember_uploaded_image(sender, instance, **kwargs):
+    if instance.image and not instance.image._committed:
+        instance._image_uploaded = True
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, **kwargs):
+    loaded = instance.__dict__.setdefault('_loaded_values', {})
+    previous = loaded.get('image') or ''
+    current = instance.image.name or ''
+    uploaded = instance.__dict__.pop('_image_uploaded', False)
+    if previous == current and not uploaded:
+        return
+    if current:
+        acquire_file(current, uploaded=uploaded)
+    if previous:
+        release_file(instance.image.storage, previous)
+    loaded['image'] = current
+
+
+@receiver(post_save, sender=Post)
+def render_post_image(sender, instance, **kwargs):
+    refresh_image_meta(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    unindex_posts([instance.id])
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        release_file(instance.image.storage, instance.image.name)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_feeds(sender, instance, **kwargs):
+    invalidate_feed_counts({GLOBAL_FEED, category_feed(instance.id)})
+    bump_version('category', instance.id)
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location(sender, instance, **kwargs):
+    bump_version('location', instance.id)
+    invalidate_catalog()
+
+
+@receiver(pre_save, sender=User)
+def remember_user_fields(sender, instance, update_fields=None, **kwargs):
+    instance._previous_page_fields = None
+    if instance._state.adding or (
+            update_fields is not None
+            and not set(USER_PAGE_FIELDS) & set(update_fields)):
+        return
+    instance._previous_page_fields = User.objects.filter(
+        pk=instance.pk
+    ).values(*USER_PAGE_FIELDS).first()
+
+
+def invalidate_user_pages(user, usernames):
+    bump_version('user', user.id)
+    bump_versions('profile', usernames)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, created, **kwargs):
+    """Сбрасывает страницы автора, если изменились показанные на них поля.
+
+    Логин виден ещё в карточках и комментариях, поэтому при его смене
+    сбрасываются страницы публикаций автора и тех, что он комментировал.
+    """
+    previous = getattr(instance, '_previous_page_fields', None)
+    if created or previous is None:
+        return
+    current = {field: getattr(instance, field) for field in USER_PAGE_FIELDS}
+    if current == previous:
+        return
+    invalidate_user_pages(
+        instance, {previous['username'], instance.username}
+    )
+    if previous['username'] != instance.username:
+        bump_versions('post', instance.posts.values_list('id', flat=True))
+        bump_versions('comments', Comment.objects.filter(
+            author=instance
+        ).order_by().values_list('post_id', flat=True).distinct())
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    invalidate_user_pages(instance, {instance.username})
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_ADDRESSED_NAME = re.compile(r'(^|/)[0-9a-f]{64}(_\w+)?\.\w+$')
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED_NAME.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, сохраняющее каждый файл один раз под его SHA-256.
+
+    Имя файла — <каталог upload_to>/<2 символа хеша>/<хеш><расширение>;
+    хеш считается по мере записи во временный файл, поэтому загрузка
+    читается один раз. Повторная загрузка того же содержимого возвращает
+    имя уже лежащего на диске файла. Файл кладётся под блокировкой его
+    строки StoredFile (blog.blobs.store_file), чтобы не разойтись
+    с удалением освобождённого файла.
+    """
+
+    content_addressed = True
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        directory, original = os.path.split(name)
+        extension = os.path.splitext(original)[1].lower()
+        digest = hashlib.sha256()
+        temp_path = self._write_temp(directory, content, digest)
+        hexdigest = digest.hexdigest()
+        name = os.path.join(
+            directory, hexdigest[:2], hexdigest + extension
+        ).replace('\\', '/')
+        from .blobs import store_file
+
+        try:
+            store_file(name, lambda: self._store(temp_path, name))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name
+
+    def save_as(self, name, content):
+        """Сохраняет производный файл точно под именем name, если его нет."""
+        if not self.exists(name):
+            self._store(
+                self._write_temp(os.path.dirname(name), content), name
+            )
+        return name
+
+    def _write_temp(self, directory, content, digest=None):
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=full_directory, suffix='.part'
+        )
+        try:
+            with os.fdopen(descriptor, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    if digest is not None:
+                        digest.update(chunk)
+                    temp_file.write(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return temp_path
+
+    def _store(self, temp_path, name):
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            os.remove(temp_path)
+            return
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(temp_path, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
@@ -0,0 +1,34 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from blog.cache import cache_get_many, post_card_keys
+from blog.constants import POST_CARD_TTL
+from blog.images import picture_sources
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    posts = list(posts)
+    keys = post_card_keys(posts)
+    cached = cache_get_many(keys)
+    rendered = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        card = cached.get(key)
+        if card is None:
+            card = rendered[key] = render_to_string(
+                'includes/post_card.html', {'post': post}
+            )
+        cards.append(mark_safe(card))
+    if rendered:
+        cache.set_many(rendered, POST_CARD_TTL)
+    return cards
+
+
+@register.inclusion_tag('includes/post_picture.html')
+def post_picture(post, kind):
+    return picture_sources(post, kind)
@@ -0,0 +1,103 @@
+"""Потоковый приём загрузок с ограничением размера и числа пикселей."""
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (
+    StopUpload, TemporaryFileUploadHandler
+)
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+
+def _too_large_message():
+    return f'Файл больше {filesizeformat(settings.MAX_IMAGE_UPLOAD_SIZE)}.'
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку во временный файл и обрывает её сверх лимита.
+
+    Как только файл превышает MAX_IMAGE_UPLOAD_SIZE байт, разбор запроса
+    останавливается без дочитывания тела (StopUpload с connection_reset),
+    а ошибка запоминается в request.upload_errors по имени поля.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.MAX_IMAGE_UPLOAD_SIZE:
+            self.request.upload_errors = {
+                **getattr(self.request, 'upload_errors', {}),
+                self.field_name: _too_large_message(),
+            }
+            raise StopUpload(connection_reset=True)
+        return super().receive_data_chunk(raw_data, start)
+
+
+def limit_uploads(view):
+    """Принимает загрузки представления через LimitedUploadHandler.
+
+    Обработчики заменяются до первого чтения request.POST, а его делает
+    CsrfViewMiddleware, поэтому проверка CSRF переносится внутрь.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [LimitedUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+class AbortedUpload(UploadedFile):
+    """Заглушка оборванной загрузки: поле формы покажет upload_error."""
+
+    def __init__(self, upload_error):
+        super().__init__(name='upload', size=0)
+        self.upload_error = upload_error
+
+
+def uploaded_files(request):
+    """request.FILES с заглушками для загрузок, оборванных по размеру."""
+    errors = getattr(request, 'upload_errors', None)
+    if not errors:
+        return request.FILES
+    files = request.FILES.copy()
+    for field_name, error in errors.items():
+        files[field_name] = AbortedUpload(error)
+    return files
+
+
+def read_image_header(file):
+    """Читает формат и размеры изображения без декодирования пикселей."""
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            return image.format, image.size
+    except (OSError, ValueError):
+        return None, None
+    finally:
+        file.seek(0)
+
+
+def _pixels(file):
+    try:
+        _, size = read_image_header(file)
+    except Image.DecompressionBombError:
+        return float('inf')
+    return size[0] * size[1] if size else 0
+
+
+def validate_image_upload(file):
+    error = getattr(file, 'upload_error', None)
+    if error:
+        raise ValidationError(error, code='file_too_large')
+    if file.size > settings.MAX_IMAGE_UPLOAD_SIZE:
+        raise ValidationError(_too_large_message(), code='file_too_large')
+    if _pixels(file) > settings.MAX_IMAGE_PIXELS:
+        raise ValidationError(
+            'Изображение больше %(pixels)s пикселей.',
+            code='too_many_pixels',
+            params={'pixels': settings.MAX_IMAGE_PIXELS}
+        )
@@ -31,6 +31,16 @@ urlpatterns = [
         views.post_detail,
         name='post_detail'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
+    path(
+        'search/',
+        views.search,
+        name='search'
+    ),
     path(
         'category/<slug:category_slug>/',
         views.category_posts,
@@ -70,4 +80,8 @@ urlpatterns = [
         'profile/',
         include(profile)
     ),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+] + static(
+    settings.MEDIA_URL,
+    view=views.serve_media,
+    document_root=settings.MEDIA_ROOT
+)
@@ -4,10 +4,24 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.contrib.auth.forms import UserCreationForm
+from django.db import transaction
+from django.conf import settings
+from django.http import Http404
+from django.views.static import serve
 
-from .services import annotate_with_comments, filter_by_date, post_paginator
+from .cache import (
+    GLOBAL_FEED, author_feed, cache_anonymous_page, category_feed,
+    conditional_page, version_key
+)
+from .services import (
+    comment_paginator, filter_by_date, is_visible, latest_publication,
+    post_paginator, remove_comment, search_paginator, select_post_relations,
+    thread_paginator
+)
 from .models import Category, Comment, Post, User
+from .storage import is_content_addressed
 from .forms import CommentForm, EditProfileForm, PostForm
+from .uploads import limit_uploads, uploaded_files
 
 
 class RegistrationView(CreateView):
@@ -16,32 +30,139 @@ class RegistrationView(CreateView):
     success_url = reverse_lazy('blog:index')
 
 
+def feed_page_versions(*args, **kwargs):
+    return (version_key('feed', GLOBAL_FEED),)
+
+
+def category_page_versions(category_slug):
+    return (
+        version_key('feed', GLOBAL_FEED),
+        version_key('category-page', category_slug),
+    )
+
+
+def feed_of_index():
+    return GLOBAL_FEED
+
+
+def feed_of_category(category_slug):
+    return category_feed(Category.objects.filter(
+        slug=category_slug
+    ).values_list('id', flat=True).first())
+
+
+def profile_page_versions(username):
+    return (
+        version_key('feed', GLOBAL_FEED),
+        version_key('profile', username),
+    )
+
+
+def latest_in_index():
+    return latest_publication()
+
+
+def latest_in_category(category_slug):
+    return latest_publication(
+        Post.objects.filter(category__slug=category_slug)
+    )
+
+
+def latest_in_profile(username):
+    return latest_publication(
+        Post.objects.filter(author__username=username)
+    )
+
+
+def post_page_versions(post_id):
+    return (
+        version_key('post', post_id),
+        version_key('comments', post_id),
+        version_key('catalog', GLOBAL_FEED),
+    )
+
+
+@conditional_page(feed_page_versions, latest_in_index)
+@cache_anonymous_page(feed_page_versions, feed_of_index)
 def index(request):
-    posts = annotate_with_comments(filter_by_date(Post.objects))
-    page_obj = post_paginator(request, posts)
+    posts = select_post_relations(filter_by_date(Post.objects))
+    page_obj = post_paginator(request, posts, feed=GLOBAL_FEED)
     return render(request, 'blog/index.html', {'page_obj': page_obj})
 
 
+def get_visible_post(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'category', 'location'),
+        id=post_id,
+    )
+    if request.user != post.author and not is_visible(post):
+        raise Http404
+    return post
+
+
+def thread_context(request, post, thread):
+    return {
+        'root_id': thread,
+        'replies': thread_paginator(
+            post, int(thread), request.GET.get('after')
+        ),
+    }
+
+
+@conditional_page(post_page_versions)
+@cache_anonymous_page(post_page_versions)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    if request.user != post.author:
-        post = get_object_or_404(filter_by_date(Post.objects), id=post_id)
-    comments = post.comments.all().select_related('author',)
-    return render(request, 'blog/detail.html', {
-        'post': post, 'comments': comments, 'form': CommentForm()
+    post = get_visible_post(request, post_id)
+    context = {
+        'post': post, 'form': CommentForm(),
+        'reply_to': request.GET.get('reply_to'),
+    }
+    thread = request.GET.get('thread', '')
+    if thread.isdigit():
+        context.update(thread_context(request, post, thread))
+    else:
+        context['comments'] = comment_paginator(
+            post, request.GET.get('comments_after')
+        )
+    return render(request, 'blog/detail.html', context)
+
+
+@conditional_page(post_page_versions)
+@cache_anonymous_page(post_page_versions)
+def post_comments(request, post_id):
+    post = get_visible_post(request, post_id)
+    thread = request.GET.get('thread', '')
+    if thread.isdigit():
+        return render(request, 'includes/comment_thread.html', {
+            'post': post, **thread_context(request, post, thread)
+        })
+    comments = comment_paginator(post, request.GET.get('after'))
+    return render(request, 'includes/comment_list.html', {
+        'post': post, 'comments': comments
     })
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    return render(request, 'blog/search.html', {
+        'query': query, 'page_obj': search_paginator(request, query)
+    })
+
+
+@conditional_page(category_page_versions, latest_in_category)
+@cache_anonymous_page(category_page_versions, feed_of_category)
 def category_posts(request, category_slug):
     category = get_object_or_404(
         Category,
         slug=category_slug,
         is_published=True,
     )
-    posts = annotate_with_comments(
+    posts = select_post_relations(
         filter_by_date(category.posts)
     )
-    page_obj = post_paginator(request, posts)
+    page_obj = post_paginator(
+        request, posts, feed=category_feed(category.id)
+    )
     return render(
         request,
         'blog/category.html',
@@ -49,13 +170,17 @@ def category_posts(request, category_slug):
     )
 
 
+@conditional_page(profile_page_versions, latest_in_profile)
 def profile(request, username):
     profile = get_object_or_404(User, username=username)
-    posts_list = annotate_with_comments(profile.posts.all())
-    if not request.user == profile:
+    posts_list = select_post_relations(profile.posts.all())
+    is_owner = request.user == profile
+    if not is_owner:
         posts_list = filter_by_date(posts_list)
 
-    page_obj = post_paginator(request, posts_list)
+    page_obj = post_paginator(
+        request, posts_list, feed=author_feed(profile.id, own=is_owner)
+    )
     return render(
         request,
         'blog/profile.html',
@@ -63,9 +188,26 @@ def profile(request, username):
     )
 
 
+def serve_media(request, path, document_root=None):
+    """Раздача медиа для разработки; в продакшене заголовок ставит сервер.
+
+    Подключается через static() только при DEBUG, см. комментарий
+    к MEDIA_CACHE_MAX_AGE в настройках.
+    """
+    response = serve(request, path, document_root=document_root)
+    if is_content_addressed(path):
+        response['Cache-Control'] = (
+            f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable'
+        )
+    return response
+
+
 @login_required
+@limit_uploads
 def create_post(request, post_id=None):
-    form = PostForm(request.POST or None, files=request.FILES or None)
+    form = PostForm(
+        request.POST or None, files=uploaded_files(request) or None
+    )
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
@@ -75,11 +217,15 @@ def create_post(request, post_id=None):
 
 
 @login_required
+@limit_uploads
 def edit_post(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
         return redirect('blog:post_detail', post_id)
-    form = PostForm(request.POST or None, instance=post)
+    form = PostForm(
+        request.POST or None, files=uploaded_files(request) or None,
+        instance=post
+    )
     if form.is_valid():
         form.save()
         return redirect('blog:post_detail', post_id)
@@ -114,6 +260,7 @@ def delete_post(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -121,13 +268,18 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        parent_id = request.POST.get('parent', '')
+        if parent_id.isdigit():
+            comment.parent = get_object_or_404(
+                Comment, id=parent_id, post=post
+            )
         comment.save()
     return redirect('blog:post_detail', post_id=post_id)
 
 
 @login_required
 def edit_comment(request, post_id, comment_id):
-    comment = get_object_or_404(Comment, id=comment_id)
+    comment = get_object_or_404(Comment, id=comment_id, is_removed=False)
     if request.user != comment.author:
         return redirect('blog:post_detail', post_id=post_id)
     form = CommentForm(request.POST or None, instance=comment)
@@ -140,12 +292,13 @@ def edit_comment(request, post_id, comment_id):
 
 
 @login_required
+@transaction.atomic
 def delete_comment(request, post_id, comment_id):
-    comment = get_object_or_404(Comment, id=comment_id)
+    comment = get_object_or_404(Comment, id=comment_id, is_removed=False)
     if request.user != comment.author:
         return redirect('blog:post_detail', post_id=post_id)
     if request.method == 'POST':
-        comment.delete()
+        remove_comment(comment)
         return redirect('blog:post_detail', post_id=post_id)
 
     return render(request, 'blog/comment.html', {'comment': comment})
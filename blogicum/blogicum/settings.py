@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,6 +27,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,7 +47,7 @@ TEMPLATES_DIR = BASE_DIR / 'templates'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templates.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -120,3 +122,46 @@ CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+
+
+JOB_WORKER_CONCURRENCY = 2
+
+JOB_WORKER_POLL_INTERVAL = 1
+
+JOB_MAX_ATTEMPTS = 3
+
+JOB_LEASE_TIMEOUT = 60 * 10
+
+DEFAULT_FILE_STORAGE = 'blog.storage.ContentAddressedStorage'
+
+# Файлы хранилища по хешу неизменны. Django раздаёт медиа только при
+# DEBUG (blog.views.serve_media); в продакшене веб-сервер перед приложением
+# должен сам отдавать файлы с именем-хешем (<64 hex-символа>[_копия].ext)
+# с заголовком Cache-Control: public, max-age=MEDIA_CACHE_MAX_AGE,
+# immutable.
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+
+MAX_IMAGE_PIXELS = 40_000_000
+
+# Файлы метрик живут вне исходников; каталог общий для всех воркеров.
+METRICS_DIR = Path(tempfile.gettempdir()) / 'blogicum-metrics'
+
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.middleware': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import include, path
 
 from blog.views import RegistrationView
+from core.views import metrics
 
 
 handler404 = 'pages.views.page_not_found'
@@ -10,6 +11,11 @@ handler500 = 'pages.views.tr_handler500'
 
 
 urlpatterns = [
+    path(
+        'admin/metrics/',
+        metrics,
+        name='metrics'
+    ),
     path(
         'admin/',
         admin.site.urls
@@ -0,0 +1,377 @@
+"""Счётчики и гистограммы запросов, общие для всех процессов-воркеров.
+
+Каждый процесс пишет значения в собственный файл в METRICS_DIR,
+отображённый в память, поэтому запись — это поиск смещения в словаре
+и struct.pack_into без межпроцессных блокировок. Экспорт в формате
+Prometheus складывает файлы всех процессов. Новый процесс при старте
+переносит файлы завершившихся процессов в aggregate.db, так что число
+файлов не растёт с перезапусками воркеров.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+INITIAL_FILE_SIZE = 64 * 1024
+AGGREGATE_FILE = 'aggregate.db'
+LOCK_FILE = '.lock'
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_HEADER = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+
+
+def _aligned(position):
+    return position + (-position % 8)
+
+
+def _format(value):
+    if value == int(value):
+        return f'{value:.1f}'
+    return repr(value)
+
+
+def read_entries(data, used):
+    """Перебирает (ключ, значение, смещение значения) записей файла."""
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        start = position + _LENGTH.size
+        key = bytes(data[start:start + length]).decode()
+        position = _aligned(start + length)
+        yield key, _VALUE.unpack_from(data, position)[0], position
+        position += _VALUE.size
+
+
+class MetricsFile:
+    """Файл значений одного процесса.
+
+    Запись добавляется целиком до того, как в заголовке сдвигается
+    граница занятого места, поэтому читатели из других процессов видят
+    только дописанные записи.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'a+b')
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        if self._capacity < INITIAL_FILE_SIZE:
+            self._capacity = INITIAL_FILE_SIZE
+            self._file.truncate(self._capacity)
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        self._positions = {
+            key: position
+            for key, _, position in read_entries(self._map, self._used)
+        }
+        self._lock = threading.Lock()
+
+    def add(self, updates):
+        """Прибавляет значения по ключам из пар (ключ, приращение)."""
+        with self._lock:
+            for key, amount in updates:
+                position = self._positions.get(key)
+                if position is None:
+                    position = self._append(key)
+                value = _VALUE.unpack_from(self._map, position)[0]
+                _VALUE.pack_into(self._map, position, value + amount)
+
+    def _append(self, key):
+        encoded = key.encode()
+        position = _aligned(self._used + _LENGTH.size + len(encoded))
+        end = position + _VALUE.size
+        if end > self._capacity:
+            self._grow(end)
+        _LENGTH.pack_into(self._map, self._used, len(encoded))
+        start = self._used + _LENGTH.size
+        self._map[start:start + len(encoded)] = encoded
+        _VALUE.pack_into(self._map, position, 0.0)
+        self._used = end
+        _HEADER.pack_into(self._map, 0, end)
+        self._positions[key] = position
+        return position
+
+    def _grow(self, size):
+        while self._capacity < size:
+            self._capacity *= 2
+        self._map.close()
+        self._file.truncate(self._capacity)
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def read_file(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < _HEADER.size:
+        return
+    used = _HEADER.unpack_from(data, 0)[0]
+    for key, value, _ in read_entries(data, used):
+        yield key, value
+
+
+@contextmanager
+def directory_lock(directory, exclusive=False):
+    """Общая блокировка для экспорта, исключительная — для слияния.
+
+    Так экспорт не застанет значения слитого файла дважды или ни разу.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(Path(directory) / LOCK_FILE, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_dead_workers(directory):
+    """Переносит файлы завершившихся процессов в aggregate.db.
+
+    Проверка процесса через kill(pid, 0) есть только на POSIX; на других
+    системах файлы не сливаются. Возвращает число слитых файлов.
+    """
+    if fcntl is None:
+        return 0
+    directory = Path(directory)
+    with directory_lock(directory, exclusive=True):
+        dead = [
+            path for path in directory.glob('worker_*.db')
+            if not _pid_alive(int(path.stem.rpartition('_')[2]))
+        ]
+        if not dead:
+            return 0
+        aggregate = MetricsFile(directory / AGGREGATE_FILE)
+        try:
+            for path in dead:
+                aggregate.add(list(read_file(path)))
+                path.unlink()
+        finally:
+            aggregate.close()
+    return len(dead)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def current_file():
+    """Файл текущего процесса; после fork открывается заново."""
+    global _store
+    directory = settings.METRICS_DIR
+    pid = os.getpid()
+    store = _store
+    if store is not None and store[:2] == (pid, directory):
+        return store[2]
+    with _store_lock:
+        if _store is None or _store[:2] != (pid, directory):
+            if _store is not None:
+                _store[2].close()
+            path = Path(directory)
+            path.mkdir(parents=True, exist_ok=True)
+            merge_dead_workers(path)
+            _store = (pid, directory, MetricsFile(path / f'worker_{pid}.db'))
+        return _store[2]
+
+
+def sample_key(name, labels):
+    return json.dumps([name, dict(labels)], ensure_ascii=False)
+
+
+class Metric:
+    """Базовый класс метрики.
+
+    updates() только готовит пары (ключ, приращение), чтобы несколько
+    метрик одного запроса записывались в файл под одной блокировкой.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.keys = lru_cache(maxsize=4096)(self._keys)
+        METRICS.append(self)
+
+    def labels(self, values):
+        return tuple(zip(self.labelnames, values))
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def _keys(self, labelvalues):
+        return sample_key(self.name, self.labels(labelvalues))
+
+    def updates(self, *labelvalues, amount=1):
+        return ((self.keys(labelvalues), amount),)
+
+    def inc(self, *labelvalues, amount=1):
+        current_file().add(self.updates(*labelvalues, amount=amount))
+
+    def samples(self, values):
+        return sorted(
+            ('', labels, value) for (name, labels), value in values.items()
+            if name == self.name
+        )
+
+
+class Histogram(Metric):
+    """Гистограмма с фиксированными границами корзин.
+
+    В файл пишется число наблюдений в каждой корзине, а накопленные
+    значения le, как того требует формат Prometheus, считаются при
+    экспорте.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+        self.bounds = [_format(bound) for bound in self.buckets] + ['+Inf']
+
+    def _keys(self, labelvalues):
+        labels = self.labels(labelvalues)
+        return (
+            [
+                sample_key(f'{self.name}_bucket', labels + (('le', bound),))
+                for bound in self.bounds
+            ],
+            sample_key(f'{self.name}_sum', labels),
+            sample_key(f'{self.name}_count', labels),
+        )
+
+    def updates(self, value, *labelvalues):
+        buckets, sum_key, count_key = self.keys(labelvalues)
+        return (
+            (buckets[bisect_left(self.buckets, value)], 1),
+            (sum_key, value),
+            (count_key, 1),
+        )
+
+    def observe(self, value, *labelvalues):
+        current_file().add(self.updates(value, *labelvalues))
+
+    def samples(self, values):
+        buckets = defaultdict(dict)
+        for (name, labels), value in values.items():
+            if name == f'{self.name}_bucket':
+                labels = dict(labels)
+                bound = labels.pop('le')
+                buckets[tuple(labels.items())][bound] = value
+        result = []
+        for labels in sorted(buckets):
+            total = 0
+            for bound in self.bounds:
+                total += buckets[labels].get(bound, 0)
+                result.append(
+                    ('_bucket', labels + (('le', bound),), total)
+                )
+            for suffix in ('_sum', '_count'):
+                result.append(
+                    (suffix, labels, values.get((self.name + suffix, labels)))
+                )
+        return result
+
+
+METRICS = []
+
+REQUESTS = Counter(
+    'blogicum_requests_total',
+    'Число запросов по маршрутам и кодам ответа.',
+    ('view', 'status')
+)
+REQUEST_DURATION = Histogram(
+    'blogicum_request_duration_seconds',
+    'Время обработки запроса по маршрутам.',
+    ('view',), LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    'blogicum_request_db_queries',
+    'Число SQL-запросов на один запрос по маршрутам.',
+    ('view',), QUERY_BUCKETS
+)
+
+
+def record_request(view, status, duration, queries):
+    current_file().add((
+        *REQUESTS.updates(view, status),
+        *REQUEST_DURATION.updates(duration, view),
+        *REQUEST_QUERIES.updates(queries, view),
+    ))
+
+
+def collect():
+    """Складывает значения из файлов всех процессов."""
+    values = defaultdict(float)
+    directory = Path(settings.METRICS_DIR)
+    if not directory.is_dir():
+        return values
+    with directory_lock(directory):
+        for path in directory.glob('*.db'):
+            for key, value in read_file(path):
+                name, labels = json.loads(key)
+                values[name, tuple(sorted(labels.items()))] += value
+    return values
+
+
+def _escape(value):
+    return (
+        value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+    )
+
+
+def _sample_line(name, labels, value):
+    if labels:
+        pairs = ','.join(
+            f'{label}="{_escape(str(label_value))}"'
+            for label, label_value in labels
+        )
+        name = f'{name}{{{pairs}}}'
+    return f'{name} {_format(value or 0.0)}'
+
+
+def render_metrics():
+    values = collect()
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for suffix, labels, value in metric.samples(values):
+            lines.append(_sample_line(metric.name + suffix, labels, value))
+    return '\n'.join(lines) + '\n'
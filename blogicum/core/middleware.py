@@ -0,0 +1,55 @@
+import json
+import logging
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.db import connections
+
+from core.metrics import record_request
+from core.timing import RequestMetrics, current_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    """Замеряет запрос и отдаёт итоги в Server-Timing и в лог.
+
+    Время и число SQL-запросов собираются через execute_wrapper всех
+    подключений, время шаблонов — бэкендом core.templates, попадания в
+    кеш — функцией core.timing.record_cache. Время и число SQL-запросов
+    по маршрутам копятся также в гистограммах core.metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.db_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        total = perf_counter() - started
+        response['Server-Timing'] = metrics.server_timing(total)
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else None
+        record_request(
+            view or 'unresolved', response.status_code, total,
+            metrics.db_queries
+        )
+        fields = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **metrics.as_dict(total),
+        }
+        logger.info(json.dumps(fields, ensure_ascii=False), extra=fields)
+        return response
@@ -1,4 +1,22 @@
 from django.db import models
+from django.utils.timezone import now
+
+
+class UpdatedAtField(models.DateTimeField):
+    """Индексированная отметка последнего изменения записи."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('auto_now', True)
+        kwargs.setdefault('db_index', True)
+        super().__init__(*args, **kwargs)
+
+
+class UpdatedAtQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        for field in self.model._meta.concrete_fields:
+            if isinstance(field, UpdatedAtField):
+                kwargs.setdefault(field.name, now())
+        return super().update(**kwargs)
 
 
 class CreatedAt(models.Model):
@@ -6,10 +24,19 @@ class CreatedAt(models.Model):
         auto_now_add=True,
         verbose_name='Добавлено'
     )
+    updated_at = UpdatedAtField(verbose_name='Изменено')
+
+    objects = UpdatedAtQuerySet.as_manager()
 
     class Meta:
         abstract = True
 
+    @classmethod
+    def last_changed(cls):
+        return cls.objects.order_by('-updated_at').values_list(
+            'updated_at', flat=True
+        ).first()
+
 
 class PublishedCreated(CreatedAt):
     is_published = models.BooleanField(
@@ -0,0 +1,72 @@
+"""Замеры времени текущего запроса: база данных, шаблоны и кеш.
+
+Счётчики запроса живут в contextvar, поэтому код вне запроса (команды,
+фоновые задачи) может вызывать функции записи без проверок.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - started
+            self.db_queries += 1
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.db_queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+    def as_dict(self, total):
+        return {
+            'total_ms': round(total * 1000, 1),
+            'db_ms': round(self.db_time * 1000, 1),
+            'db_queries': self.db_queries,
+            'template_ms': round(self.template_time * 1000, 1),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+@contextmanager
+def template_timer():
+    """Учитывает только внешний рендер, вложенные входят в его время."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    metrics.template_depth += 1
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.template_depth -= 1
+        if not metrics.template_depth:
+            metrics.template_time += perf_counter() - started
+
+
+def record_cache(hits, misses):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
@@ -0,0 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+
+from core.metrics import CONTENT_TYPE, render_metrics
+
+
+@staff_member_required
+def metrics(request):
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
@@ -0,0 +1,229 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.test.client import Client
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def admin_client(client: Client):
+    admin = get_user_model().objects.create_superuser(
+        "admin", "admin@example.com", "password"
+    )
+    client.force_login(admin)
+    return client
+
+
+@pytest.fixture
+def many_comments(mixer: Mixer, user, another_user):
+    posts = mixer.cycle(5).blend("blog.Post", author=user)
+    return [
+        mixer.blend(
+            "blog.Comment", post=post,
+            author=user if i % 2 else another_user,
+        )
+        for i, post in enumerate(posts * 4)
+    ]
+
+
+def _changelist_ids(admin_client: Client, **params):
+    response = admin_client.get("/admin/blog/comment/", params)
+    assert response.status_code == 200
+    return {comment.id for comment in response.context["cl"].result_list}
+
+
+@pytest.mark.parametrize("n_comments", [5, 20])
+def test_comment_changelist_queries_are_bounded(
+        n_comments, admin_client: Client, many_comments,
+        django_assert_max_num_queries
+):
+    from blog.models import Comment
+
+    Comment.objects.exclude(
+        pk__in=[comment.pk for comment in many_comments[:n_comments]]
+    ).delete()
+    with django_assert_max_num_queries(10) as captured:
+        admin_client.get("/admin/blog/comment/")
+    queries = [query["sql"] for query in captured.captured_queries]
+    assert not any(
+        'FROM "blog_post"' in sql or 'DISTINCT "blog_comment"."text"' in sql
+        for sql in queries
+    ), (
+        "Убедитесь, что список комментариев в админке не загружает все "
+        "публикации и тексты для фильтров."
+    )
+    assert not any(
+        'FROM "auth_user"' in sql and "WHERE" not in sql for sql in queries
+    )
+
+
+def test_comment_changelist_filters(
+        admin_client: Client, many_comments, another_user
+):
+    post = many_comments[0].post
+    assert _changelist_ids(admin_client, post=post.id) == {
+        comment.id for comment in many_comments if comment.post == post
+    }
+    assert _changelist_ids(admin_client, author=another_user.id) == {
+        comment.id for comment in many_comments
+        if comment.author == another_user
+    }
+    assert _changelist_ids(admin_client, q=another_user.username) == (
+        _changelist_ids(admin_client, author=another_user.id)
+    )
+    assert _changelist_ids(admin_client, q=str(post.id)) >= {
+        comment.id for comment in many_comments if comment.post == post
+    }
+
+
+def test_comment_search_does_not_scan_text(
+        admin_client: Client, many_comments, django_assert_max_num_queries
+):
+    with django_assert_max_num_queries(10) as captured:
+        admin_client.get(
+            "/admin/blog/comment/", {"q": many_comments[0].text[:20]}
+        )
+    assert not any(
+        '"blog_comment"."text" LIKE' in query["sql"]
+        for query in captured.captured_queries
+    ), (
+        "Убедитесь, что поиск комментариев в админке не просматривает "
+        "тексты через LIKE."
+    )
+
+
+def _page_queries(admin_client: Client, captured_factory, page: int):
+    with captured_factory(20) as captured:
+        response = admin_client.get("/admin/blog/comment/", {"p": page})
+    ids = [comment.id for comment in response.context["cl"].result_list]
+    return ids, [query["sql"] for query in captured.captured_queries]
+
+
+def test_comment_changelist_pages_by_key(
+        monkeypatch, admin_client: Client, many_comments,
+        django_assert_max_num_queries
+):
+    from blog.admin import Commentadmin
+    from blog.models import Comment
+
+    monkeypatch.setattr(Commentadmin, "list_per_page", 3)
+    expected = list(Comment.objects.order_by(
+        "-created_at", "-id"
+    ).values_list("id", flat=True))
+    seen = []
+    for page in range(1, len(expected) // 3 + 2):
+        ids, queries = _page_queries(
+            admin_client, django_assert_max_num_queries, page
+        )
+        seen.extend(ids)
+        comment_queries = [
+            sql for sql in queries if 'FROM "blog_comment"' in sql
+        ]
+        if page > 1:
+            assert not any("OFFSET" in sql for sql in comment_queries), (
+                "Убедитесь, что следующая страница списка в админке "
+                "выбирается по ключу, без OFFSET."
+            )
+            assert not any("COUNT(" in sql for sql in comment_queries), (
+                "Убедитесь, что число строк списка в админке кешируется."
+            )
+    assert seen == expected
+
+
+def test_deep_admin_page_offsets_only_keys(
+        monkeypatch, admin_client: Client, many_comments,
+        django_assert_max_num_queries
+):
+    from blog.admin import Commentadmin
+
+    monkeypatch.setattr(Commentadmin, "list_per_page", 3)
+    ids, queries = _page_queries(
+        admin_client, django_assert_max_num_queries, 5
+    )
+    assert len(ids) == 3
+    offset_queries = [sql for sql in queries if "OFFSET" in sql]
+    assert offset_queries and all(
+        sql.startswith('SELECT "blog_comment"."id" FROM')
+        for sql in offset_queries
+    ), (
+        "Убедитесь, что при переходе на глубокую страницу OFFSET "
+        "применяется только к выборке первичных ключей."
+    )
+
+
+def test_admin_pages_past_capped_count(
+        monkeypatch, admin_client: Client, many_comments
+):
+    from blog import paginators
+    from blog.admin import Commentadmin
+
+    monkeypatch.setattr(Commentadmin, "list_per_page", 3)
+    monkeypatch.setattr(paginators, "MAX_COUNTED_PAGES", 2)
+    response = admin_client.get("/admin/blog/comment/", {"p": 5})
+    assert response.status_code == 200, (
+        "Убедитесь, что страницы за пределом подсчёта строк в админке "
+        "открываются."
+    )
+    assert len(response.context["cl"].result_list) == 3
+    content = response.content.decode()
+    assert "более 6" in content, (
+        "Убедитесь, что ограниченное число строк показывается как "
+        "приблизительное."
+    )
+    assert "?p=6" in content
+    assert len(admin_client.get(
+        "/admin/blog/comment/", {"p": 7}
+    ).context["cl"].result_list) == 2
+    assert admin_client.get(
+        "/admin/blog/comment/", {"p": 8}
+    ).status_code == 302
+
+
+def test_post_changelist_selects_related(
+        admin_client: Client, many_comments, django_assert_max_num_queries
+):
+    with django_assert_max_num_queries(10) as captured:
+        admin_client.get("/admin/blog/post/")
+    post_queries = [
+        query["sql"] for query in captured.captured_queries
+        if 'FROM "blog_post"' in query["sql"]
+    ]
+    assert len(post_queries) <= 2 and any(
+        'JOIN "auth_user"' in sql for sql in post_queries
+    ), (
+        "Убедитесь, что в списке публикаций админки автор и категория "
+        "выбираются вместе с публикациями."
+    )
+
+
+def test_admin_paginator_pages_annotated_ordering(mixer: Mixer, user):
+    from django.db.models import F
+
+    from blog.models import Post
+    from blog.paginators import AdminPaginator
+
+    mixer.cycle(3).blend("blog.Post", author=user)
+    posts = Post.objects.annotate(rank=-F("id")).order_by("rank")
+    paginator = AdminPaginator(posts, 2)
+    assert paginator.ordering is None, (
+        "Убедитесь, что пагинатор админки не листает по ключу, если "
+        "сортировка идёт по аннотации."
+    )
+    assert len(paginator.page(2).object_list) == 1
+
+
+def test_comment_filters_use_autocomplete(admin_client: Client, many_comments):
+    post = many_comments[0].post
+    response = admin_client.get("/admin/blog/comment/", {"post": post.id})
+    content = response.content.decode()
+    assert 'class="admin-autocomplete"' in content, (
+        "Убедитесь, что фильтры списка комментариев используют виджет "
+        "автодополнения админки."
+    )
+    assert f'<option value="{post.id}" selected>' in content
+    response = admin_client.get("/admin/autocomplete/", {
+        "term": max(post.title.split(), key=len), "app_label": "blog",
+        "model_name": "comment", "field_name": "post",
+    })
+    assert str(post.id) in {item["id"] for item in response.json()["results"]}
@@ -0,0 +1,215 @@
+from datetime import timedelta
+
+import pytest
+from django.test.client import Client
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+CARD_TEMPLATE = "includes/post_card.html"
+
+
+def _card_renders(client: Client, url: str = "/"):
+    response = client.get(url)
+    return [t.name for t in response.templates].count(CARD_TEMPLATE), response
+
+
+def test_post_cards_are_cached(
+        user_client: Client, many_posts_with_published_locations,
+        published_category
+):
+    rendered, _ = _card_renders(user_client)
+    assert rendered == 10
+    rendered, _ = _card_renders(user_client)
+    assert rendered == 0, (
+        "Убедитесь, что карточки публикаций берутся из кеша при повторной "
+        "отрисовке ленты."
+    )
+
+    published_category.title = "Обновлённая категория"
+    published_category.save()
+    rendered, response = _card_renders(user_client)
+    assert rendered == 10
+    assert "Обновлённая категория" in response.content.decode("utf-8"), (
+        "Убедитесь, что кеш карточек сбрасывается при изменении категории."
+    )
+
+    post = many_posts_with_published_locations[0]
+    post.author.username = "renamed_author"
+    post.author.save()
+    _, response = _card_renders(user_client)
+    assert "@renamed_author" in response.content.decode("utf-8"), (
+        "Убедитесь, что кеш карточек сбрасывается при изменении автора."
+    )
+
+
+def test_anonymous_pages_are_cached(
+        unlogged_client: Client, user_client: Client,
+        post_with_published_location, django_assert_max_num_queries
+):
+    post = post_with_published_location
+    for url in ("/", f"/posts/{post.id}/"):
+        unlogged_client.get(url)
+        with django_assert_max_num_queries(1):
+            cached = unlogged_client.get(url)
+        assert cached.status_code == 200
+        assert user_client.get(url).context is not None, (
+            "Убедитесь, что авторизованные пользователи получают страницу "
+            "в обход кеша."
+        )
+
+    category_url = f"/category/{post.category.slug}/"
+    unlogged_client.get(category_url)
+    user_client.post(f"/posts/{post.id}/comment/", data={"text": "Свежий"})
+    content = unlogged_client.get(f"/posts/{post.id}/").content.decode()
+    assert "Свежий" in content, (
+        "Убедитесь, что кеш страницы публикации сбрасывается при добавлении "
+        "комментария."
+    )
+    assert "(1)" in unlogged_client.get(category_url).content.decode(), (
+        "Убедитесь, что кеш страницы категории публикации сбрасывается при "
+        "добавлении комментария."
+    )
+    with django_assert_max_num_queries(1):
+        unlogged_client.get("/")
+
+
+def test_user_changes_keep_feed_cache(
+        mixer, unlogged_client: Client, post_with_published_location,
+        django_assert_max_num_queries
+):
+    from django.contrib.auth import get_user_model
+
+    unlogged_client.get("/")
+    mixer.blend(get_user_model())
+    author = post_with_published_location.author
+    author.last_name = author.last_name
+    author.save()
+    with django_assert_max_num_queries(1):
+        unlogged_client.get("/")
+    author.username = "renamed"
+    author.save()
+    content = unlogged_client.get(
+        f"/posts/{post_with_published_location.id}/"
+    ).content.decode()
+    assert "@renamed" in content, (
+        "Убедитесь, что смена логина сбрасывает кеш страниц публикаций "
+        "автора."
+    )
+
+
+def test_feed_cache_expires_with_scheduled_post(
+        mixer, user, another_user, published_category, another_category
+):
+    from blog.cache import (
+        GLOBAL_FEED, author_feed, category_feed, feed_cache_timeout
+    )
+
+    mixer.blend(
+        "blog.Post", author=user, is_published=True,
+        category=published_category,
+        pub_date=timezone.now() + timedelta(seconds=30),
+    )
+    for feed in (
+        GLOBAL_FEED, category_feed(published_category.id),
+        author_feed(user.id),
+    ):
+        assert 0 < feed_cache_timeout(feed, 3600) <= 30, (
+            "Убедитесь, что кеш ленты истекает к моменту ближайшей "
+            "отложенной публикации в этой ленте."
+        )
+    for feed in (category_feed(another_category.id),
+                 author_feed(another_user.id)):
+        assert feed_cache_timeout(feed, 3600) == 3600, (
+            "Убедитесь, что отложенная публикация не сокращает время жизни "
+            "кеша лент, в которые она не попадёт."
+        )
+
+    mixer.blend(
+        "blog.Post", author=another_user, is_published=True,
+        category=another_category,
+        pub_date=timezone.now() + timedelta(seconds=60),
+    )
+    assert 30 < feed_cache_timeout(
+        category_feed(another_category.id), 3600
+    ) <= 60
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["/", "/category/{post.category.slug}/", "/profile/{post.author.username}/",
+     "/posts/{post.id}/"],
+    ids=["index", "category", "profile", "detail"],
+)
+def test_conditional_get(
+        url, user_client: Client, unlogged_client: Client,
+        post_with_published_location, django_assert_max_num_queries
+):
+    post = post_with_published_location
+    url = url.format(post=post)
+    for client in (unlogged_client, user_client):
+        response = client.get(url)
+        assert response.has_header("ETag") and response.has_header(
+            "Last-Modified"
+        ), f"Убедитесь, что страница `{url}` отдаёт ETag и Last-Modified."
+        with django_assert_max_num_queries(3):
+            not_modified = client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        assert not_modified.status_code == 304, (
+            f"Убедитесь, что страница `{url}` отвечает 304 на запрос с "
+            "актуальным If-None-Match."
+        )
+        assert client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        ).status_code == 304
+
+    if url == "/":
+        return
+    etag = user_client.get(url)["ETag"]
+    user_client.post(f"/posts/{post.id}/comment/", data={"text": "Новый"})
+    assert user_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+        f"Убедитесь, что ETag страницы `{url}` меняется после добавления "
+        "комментария."
+    )
+
+
+def test_etag_changes_when_scheduled_post_is_due(
+        mixer, user, unlogged_client: Client, published_category
+):
+    scheduled = mixer.blend(
+        "blog.Post", author=user, is_published=True,
+        category=published_category,
+        pub_date=timezone.now() + timedelta(days=1),
+    )
+    etag = unlogged_client.get("/")["ETag"]
+    type(scheduled).objects.filter(pk=scheduled.pk).update(
+        pub_date=timezone.now() - timedelta(seconds=1)
+    )
+    response = unlogged_client.get("/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200, (
+        "Убедитесь, что ETag ленты меняется, когда наступает время "
+        "отложенной публикации."
+    )
+
+
+def test_latest_publication_matches_listing(
+        monkeypatch, mixer, user, published_category
+):
+    from blog import services
+
+    instant = timezone.now()
+    mixer.blend(
+        "blog.Post", author=user, is_published=True,
+        category=published_category, pub_date=instant,
+    )
+    hidden = mixer.blend("blog.Category", is_published=False)
+    mixer.blend(
+        "blog.Post", author=user, is_published=True, category=hidden,
+        pub_date=instant - timedelta(days=1),
+    )
+    monkeypatch.setattr(services, "now", lambda: instant)
+    assert services.latest_publication() is None, (
+        "Убедитесь, что Last-Modified считается только по публикациям, "
+        "которые видны в ленте."
+    )
@@ -0,0 +1,52 @@
+import pytest
+from django.core.management import call_command
+from django.db.models import Model
+from django.test.client import Client
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _refreshed_count(post: Model) -> int:
+    post.refresh_from_db(fields=["comment_count"])
+    return post.comment_count
+
+
+def test_counter_follows_views(
+        user_client: Client, post_with_published_location
+):
+    post = post_with_published_location
+    for text in ("first", "second"):
+        user_client.post(f"/posts/{post.id}/comment/", data={"text": text})
+    assert _refreshed_count(post) == 2, (
+        "Убедитесь, что при добавлении комментария счётчик комментариев "
+        "публикации увеличивается."
+    )
+    comment = post.comments.first()
+    user_client.post(f"/posts/{post.id}/delete_comment/{comment.id}/")
+    assert _refreshed_count(post) == 1, (
+        "Убедитесь, что при удалении комментария счётчик комментариев "
+        "публикации уменьшается."
+    )
+
+
+def test_counter_follows_cascade(
+        mixer: Mixer, another_user, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(3).blend("blog.Comment", post=post, author=another_user)
+    mixer.blend("blog.Comment", post=post)
+    assert _refreshed_count(post) == 4
+    another_user.delete()
+    assert _refreshed_count(post) == 1, (
+        "Убедитесь, что счётчик комментариев уменьшается при каскадном "
+        "удалении комментариев вместе с их автором."
+    )
+
+
+def test_recount_command(mixer: Mixer, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(2).blend("blog.Comment", post=post)
+    type(post).objects.filter(pk=post.pk).update(comment_count=7)
+    call_command("recount_comments", batch_size=1)
+    assert _refreshed_count(post) == 2
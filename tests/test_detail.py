@@ -0,0 +1,247 @@
+import re
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.cache import SessionStore
+from django.http import Http404
+from django.test import RequestFactory
+from django.utils import timezone
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _detail_request(user, post_id):
+    request = RequestFactory().get(f"/posts/{post_id}/")
+    request.user = user
+    request.session = SessionStore()
+    return request
+
+
+@pytest.fixture
+def commented_post(mixer, post_with_published_location):
+    mixer.cycle(5).blend(
+        "blog.Comment", post=post_with_published_location
+    )
+    return post_with_published_location
+
+
+@pytest.mark.parametrize(
+    "viewer", ["author", "another_user", "anonymous"]
+)
+def test_post_detail_queries(
+        viewer, request, commented_post, django_assert_num_queries
+):
+    from blog.views import post_detail
+
+    user = (
+        AnonymousUser() if viewer == "anonymous"
+        else request.getfixturevalue("user" if viewer == "author" else viewer)
+    )
+    with django_assert_num_queries(2):
+        response = post_detail(_detail_request(user, commented_post.id),
+                               post_id=commented_post.id)
+    assert response.status_code == 200, (
+        "Убедитесь, что страница публикации собирается двумя запросами: "
+        "публикация со связанными объектами и комментарии."
+    )
+
+
+def test_hidden_post_is_visible_only_to_author(
+        user, another_user, commented_post, django_assert_num_queries
+):
+    from blog.views import post_detail
+
+    commented_post.pub_date = timezone.now() + timedelta(days=1)
+    commented_post.save()
+    with django_assert_num_queries(1):
+        with pytest.raises(Http404):
+            post_detail(_detail_request(another_user, commented_post.id),
+                        post_id=commented_post.id)
+    response = post_detail(_detail_request(user, commented_post.id),
+                           post_id=commented_post.id)
+    assert response.status_code == 200
+
+
+def test_comments_are_paginated(
+        monkeypatch, user_client, commented_post
+):
+    monkeypatch.setattr("blog.services.COUNT_COMMENTS", 2)
+    response = user_client.get(f"/posts/{commented_post.id}/")
+    comments = response.context["comments"]
+    assert len(comments) == 2, (
+        "Убедитесь, что на странице публикации выводится ограниченное число "
+        "комментариев."
+    )
+    seen = [comment.id for comment in comments]
+    while comments.has_next():
+        response = user_client.get(
+            f"/posts/{commented_post.id}/comments/"
+            f"?after={comments.next_cursor}"
+        )
+        assert response.status_code == 200
+        assert "<html" not in response.content.decode(), (
+            "Убедитесь, что следующая порция комментариев отдаётся "
+            "HTML-фрагментом, без базового шаблона."
+        )
+        comments = response.context["comments"]
+        seen.extend(comment.id for comment in comments)
+    assert seen == list(
+        commented_post.comments.order_by("created_at", "id").values_list(
+            "id", flat=True
+        )
+    ), "Убедитесь, что подгрузка комментариев выдаёт их все по порядку."
+
+
+@pytest.fixture
+def comment_thread(mixer, user, commented_post):
+    from blog.constants import MAX_COMMENT_DEPTH
+
+    root = commented_post.comments.order_by("created_at", "id").first()
+    thread = [root]
+    for _ in range(MAX_COMMENT_DEPTH + 2):
+        thread.append(mixer.blend(
+            "blog.Comment", post=commented_post, author=user,
+            parent=thread[-1],
+        ))
+    return thread
+
+
+def test_comment_thread_depth_is_bounded(comment_thread):
+    from blog.constants import MAX_COMMENT_DEPTH
+
+    depths = [comment.depth for comment in comment_thread]
+    assert depths[:MAX_COMMENT_DEPTH] == list(range(MAX_COMMENT_DEPTH))
+    assert max(depths) == MAX_COMMENT_DEPTH - 1, (
+        "Убедитесь, что глубина ветки комментариев ограничена: ответы "
+        "сверх предельной глубины прикрепляются к ветке выше."
+    )
+
+
+def test_comment_thread_is_fetched_with_replies(
+        monkeypatch, user_client, commented_post, comment_thread,
+        django_assert_max_num_queries
+):
+    monkeypatch.setattr("blog.services.COUNT_COMMENTS", 2)
+    from blog.services import comment_paginator
+
+    with django_assert_max_num_queries(2):
+        comments = comment_paginator(commented_post)
+        threads = [list(root.thread) for root in comments]
+    assert [reply.id for reply in threads[0]] == [
+        comment.id for comment in comment_thread[1:]
+    ], (
+        "Убедитесь, что ответы ветки выбираются одним запросом и идут в "
+        "порядке дерева."
+    )
+    assert threads[1] == []
+    content = user_client.get(f"/posts/{commented_post.id}/").content.decode()
+    for reply in comment_thread[1:]:
+        assert f'name="comment_{reply.id}"' in content
+
+
+def test_long_thread_is_loaded_lazily(
+        monkeypatch, mixer, user, user_client, commented_post,
+        django_assert_max_num_queries
+):
+    from blog.services import comment_paginator
+
+    monkeypatch.setattr("blog.services.COUNT_REPLIES", 3)
+    root = commented_post.comments.order_by("created_at", "id").first()
+    replies = [
+        mixer.blend(
+            "blog.Comment", post=commented_post, author=user, parent=root
+        )
+        for _ in range(8)
+    ]
+    with django_assert_max_num_queries(2):
+        comments = comment_paginator(commented_post)
+        threads = [list(comment.thread) for comment in comments]
+    assert [reply.id for reply in threads[0]] == [
+        reply.id for reply in replies[:3]
+    ], (
+        "Убедитесь, что при первой отрисовке из каждой ветки выбирается "
+        "ограниченное число ответов."
+    )
+    assert not any(threads[1:])
+    content = user_client.get(f"/posts/{commented_post.id}/").content.decode()
+    assert f"?thread={root.id}&after=" in content
+    more = re.search(
+        rf'href="(/posts/{commented_post.id}/\?thread={root.id}&after=[^"#]+)',
+        content
+    )
+    assert more, (
+        "Убедитесь, что ссылка на продолжение ветки без JS ведёт на страницу "
+        "публикации."
+    )
+    response = user_client.get(more.group(1))
+    assert "blog/detail.html" in [t.name for t in response.templates]
+    assert [reply.id for reply in response.context["replies"]] == [
+        reply.id for reply in replies[3:6]
+    ]
+
+    seen = [reply.id for reply in threads[0]]
+    cursor = comments[0].replies_cursor
+    while cursor:
+        response = user_client.get(
+            f"/posts/{commented_post.id}/comments/"
+            f"?thread={root.id}&after={cursor}"
+        )
+        assert response.status_code == 200
+        page = response.context["replies"]
+        assert len(page) <= 3
+        seen.extend(reply.id for reply in page)
+        cursor = page.next_cursor
+    assert seen == [reply.id for reply in replies], (
+        "Убедитесь, что остальные ответы ветки подгружаются по курсору."
+    )
+
+
+def test_reply_is_added_to_thread(user_client, commented_post):
+    root = commented_post.comments.first()
+    response = user_client.post(
+        f"/posts/{commented_post.id}/comment/",
+        {"text": "Ответ в ветке", "parent": root.id},
+    )
+    assert response.status_code == 302
+    reply = commented_post.comments.get(text="Ответ в ветке")
+    assert reply.parent == root and reply.depth == 1
+
+
+def test_deleted_comment_keeps_replies(
+        mixer, user, another_user, user_client, another_user_client,
+        commented_post
+):
+    root = mixer.blend("blog.Comment", post=commented_post, author=user)
+    reply = mixer.blend(
+        "blog.Comment", post=commented_post, author=another_user,
+        parent=root
+    )
+    count = commented_post.comments.count()
+    user_client.post(
+        f"/posts/{commented_post.id}/delete_comment/{root.id}/"
+    )
+    root.refresh_from_db()
+    assert root.is_removed and not root.text, (
+        "Убедитесь, что комментарий с ответами при удалении остаётся "
+        "заглушкой, а ответы других пользователей сохраняются."
+    )
+    assert commented_post.comments.filter(pk=reply.pk).exists()
+    commented_post.refresh_from_db()
+    assert commented_post.comment_count == count - 1
+    content = user_client.get(
+        f"/posts/{commented_post.id}/"
+    ).content.decode()
+    assert "Комментарий удалён" in content
+
+    another_user_client.post(
+        f"/posts/{commented_post.id}/delete_comment/{reply.id}/"
+    )
+    assert not commented_post.comments.filter(
+        pk__in=[root.pk, reply.pk]
+    ).exists(), (
+        "Убедитесь, что заглушка без ответов удаляется вместе с последним "
+        "ответом."
+    )
+    commented_post.refresh_from_db()
+    assert commented_post.comment_count == count - 2
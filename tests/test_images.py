@@ -0,0 +1,344 @@
+import os
+from datetime import timedelta
+from io import BytesIO
+
+import pytest
+from bs4 import BeautifulSoup
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test.client import Client
+from django.utils import timezone
+from mixer.backend.django import Mixer
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def _upload(size, name="photo.jpg", image_format="JPEG"):
+    data = BytesIO()
+    Image.new("RGB", size, "orange").save(data, image_format)
+    return SimpleUploadedFile(name, data.getvalue())
+
+
+def _processed(post):
+    from blog.jobs import run_pending_jobs
+
+    run_pending_jobs()
+    post.refresh_from_db()
+    return post
+
+
+@pytest.fixture
+def image_post(mixer: Mixer, user, published_category):
+    return _processed(mixer.blend(
+        "blog.Post", author=user, is_published=True,
+        category=published_category,
+        pub_date=timezone.now() - timedelta(days=1),
+        image=_upload((2000, 1000)),
+    ))
+
+
+def test_renditions_are_built(image_post, media_root):
+    renditions = image_post.image_meta["renditions"]
+    assert {(r["kind"], r["type"], r["width"]) for r in renditions} == {
+        ("feed", "image/webp", 640), ("feed", "image/jpeg", 640),
+        ("detail", "image/webp", 1280), ("detail", "image/jpeg", 1280),
+    }, (
+        "Убедитесь, что при загрузке изображения публикации создаются "
+        "уменьшенные копии для ленты и страницы публикации, в том числе WebP."
+    )
+    original = (media_root / image_post.image.name).stat().st_size
+    for rendition in renditions:
+        path = media_root / rendition["name"]
+        assert path.parent == (media_root / image_post.image.name).parent
+        if rendition["kind"] == "feed":
+            assert path.stat().st_size < original
+
+
+def test_feed_serves_srcset(user_client: Client, image_post):
+    content = user_client.get("/").content.decode()
+    pictures = BeautifulSoup(content, features="html.parser").find_all(
+        "picture"
+    )
+    assert len(pictures) == 1
+    img = pictures[0].find_all("img")
+    assert len(img) == 1 and img[0]["src"].endswith("_feed.jpg"), (
+        "Убедитесь, что в ленте выводится уменьшенная копия изображения."
+    )
+    source = pictures[0].find("source")
+    assert source["type"] == "image/webp"
+    assert "640w" in source["srcset"] and "1280w" in source["srcset"]
+
+    detail = user_client.get(f"/posts/{image_post.id}/").content.decode()
+    assert "_detail.jpg" in detail
+
+
+def test_small_image_is_not_upscaled(mixer: Mixer, user):
+    post = _processed(
+        mixer.blend("blog.Post", author=user, image=_upload((300, 200)))
+    )
+    assert {r["width"] for r in post.image_meta["renditions"]} == {300}
+
+
+def test_broken_image_falls_back_to_original(
+        mixer: Mixer, user, user_client: Client
+):
+    post = _processed(mixer.blend(
+        "blog.Post", author=user,
+        image=SimpleUploadedFile("broken.jpg", b"not an image"),
+    ))
+    assert post.image_meta["renditions"] == []
+    content = user_client.get(f"/posts/{post.id}/").content.decode()
+    assert f'src="{post.image.url}"' in content
+
+
+def test_placeholder_until_processed(
+        mixer: Mixer, user, published_category, user_client: Client
+):
+    post = mixer.blend(
+        "blog.Post", author=user, is_published=True,
+        category=published_category,
+        pub_date=timezone.now() - timedelta(days=1),
+        image=_upload((2000, 1000)),
+    )
+    content = user_client.get("/").content.decode()
+    assert "image_pending.svg" in content, (
+        "Убедитесь, что до окончания обработки изображения публикация "
+        "выводится с заглушкой."
+    )
+    call_command("run_jobs", once=True, concurrency=1)
+    content = user_client.get("/").content.decode()
+    assert "image_pending.svg" not in content, (
+        "Убедитесь, что после обработки изображения кеш страниц сброшен и "
+        "выводятся уменьшенные копии."
+    )
+    assert "_feed.jpg" in content
+    post.refresh_from_db()
+    assert post.image_meta["width"] == 2000
+
+
+def test_exif_is_stripped_and_orientation_fixed(mixer: Mixer, user):
+    data = BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = "Camera"
+    Image.new("RGB", (400, 200)).save(data, "JPEG", exif=exif)
+    post = _processed(mixer.blend(
+        "blog.Post", author=user,
+        image=SimpleUploadedFile("rotated.jpg", data.getvalue()),
+    ))
+    with post.image.open("rb") as file:
+        original = Image.open(file)
+        assert not original.getexif()
+        assert original.size == (200, 400)
+    assert (post.image_meta["width"], post.image_meta["height"]) == (200, 400)
+
+
+def test_failed_job_is_retried(settings, monkeypatch):
+    from blog import jobs
+    from blog.models import BackgroundJob
+
+    settings.JOB_MAX_ATTEMPTS = 2
+    monkeypatch.setitem(jobs.HANDLERS, "broken", lambda: 1 / 0)
+    job = jobs.enqueue("broken")
+    assert jobs.run_pending_jobs() == 2
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (BackgroundJob.FAILED, 2)
+    assert "ZeroDivisionError" in job.error
+
+
+def test_expired_job_is_requeued(settings, monkeypatch):
+    from blog import jobs
+    from blog.models import BackgroundJob
+
+    settings.JOB_LEASE_TIMEOUT = 60
+    calls = []
+    monkeypatch.setitem(jobs.HANDLERS, "flaky", lambda: calls.append(1))
+    job = jobs.enqueue("flaky")
+    [stale] = jobs.claim_jobs(1)
+    assert jobs.claim_jobs(1) == []
+    BackgroundJob.objects.filter(pk=job.pk).update(
+        claimed_at=timezone.now() - timedelta(minutes=5)
+    )
+    [claimed] = jobs.claim_jobs(1)
+    assert claimed.pk == job.pk and claimed.attempts == 1, (
+        "Убедитесь, что задача, аренда которой истекла, возвращается в "
+        "очередь как неудачная попытка."
+    )
+    assert jobs.run_job(claimed) == BackgroundJob.DONE
+    jobs.run_job(stale)
+    job.refresh_from_db()
+    assert job.status == BackgroundJob.DONE and len(calls) == 2
+    assert job.error == "", (
+        "Убедитесь, что опоздавший воркер не перезаписывает результат "
+        "задачи, взятой другим воркером."
+    )
+
+
+def test_expired_job_fails_after_max_attempts(settings):
+    from blog import jobs
+    from blog.models import BackgroundJob
+
+    settings.JOB_MAX_ATTEMPTS = 1
+    job = jobs.enqueue("post_image", post_id=0, source="")
+    jobs.claim_jobs(1)
+    BackgroundJob.objects.filter(pk=job.pk).update(
+        claimed_at=timezone.now() - timedelta(days=1)
+    )
+    assert jobs.claim_jobs(1) == []
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (BackgroundJob.FAILED, 1)
+
+
+def test_uploads_are_deduplicated(
+        mixer: Mixer, user, media_root, django_capture_on_commit_callbacks
+):
+    first, second = (
+        _processed(mixer.blend("blog.Post", author=user,
+                               image=_upload((800, 600))))
+        for _ in range(2)
+    )
+    assert first.image.name == second.image.name, (
+        "Убедитесь, что одинаковые загрузки хранятся одним файлом."
+    )
+    blob = media_root / first.image.name
+    renditions = [media_root / r["name"] for r in first.image_meta[
+        "renditions"
+    ]]
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert blob.exists(), (
+        "Убедитесь, что файл не удаляется, пока на него ссылаются другие "
+        "публикации."
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        second.delete()
+    assert not blob.exists() and not any(r.exists() for r in renditions), (
+        "Убедитесь, что файл без ссылок удаляется вместе с копиями."
+    )
+
+
+def test_replaced_image_is_collected(
+        mixer: Mixer, user, media_root, django_capture_on_commit_callbacks
+):
+    post = _processed(
+        mixer.blend("blog.Post", author=user, image=_upload((800, 600)))
+    )
+    old = media_root / post.image.name
+    post.image = _upload((600, 800), name="other.jpg")
+    with django_capture_on_commit_callbacks(execute=True):
+        post.save()
+    assert not old.exists()
+    assert (media_root / post.image.name).exists()
+
+
+def test_upload_is_kept_while_release_races(
+        mixer: Mixer, user, media_root, django_capture_on_commit_callbacks
+):
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+
+    from blog.models import StoredFile
+
+    post = _processed(
+        mixer.blend("blog.Post", author=user, image=_upload((800, 600)))
+    )
+    name = post.image.name
+    assert StoredFile.objects.get(name=name).pending == 0, (
+        "Убедитесь, что сохранённая публикация забирает ожидающую ссылку "
+        "загрузки."
+    )
+    blob = media_root / name
+    assert default_storage.save(
+        "birthdays_images/again.jpg", ContentFile(blob.read_bytes())
+    ) == name
+    with django_capture_on_commit_callbacks(execute=True):
+        post.delete()
+    assert blob.exists(), (
+        "Убедитесь, что файл, загруженный повторно до сохранения "
+        "публикации, не удаляется при освобождении последней ссылки."
+    )
+
+
+def test_unclaimed_uploads_are_collected(media_root):
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+
+    from blog.blobs import collect_files
+    from blog.models import StoredFile
+
+    unclaimed = default_storage.save(
+        "birthdays_images/lost.jpg", ContentFile(b"lost upload")
+    )
+    orphan = media_root / "birthdays_images" / "ab" / f"{'ab' * 32}.jpg"
+    orphan.parent.mkdir(parents=True)
+    orphan.write_bytes(b"no row")
+    assert collect_files(default_storage, grace_period=60) == 0
+    StoredFile.objects.update(stored_at=timezone.now() - timedelta(hours=1))
+    os.utime(orphan, (0, 0))
+    assert collect_files(default_storage, grace_period=60) == 2
+    assert not (media_root / unclaimed).exists() and not orphan.exists(), (
+        "Убедитесь, что загрузки без публикаций и файлы без строки "
+        "StoredFile удаляются по истечении отсрочки."
+    )
+    assert not StoredFile.objects.exists()
+
+
+def test_media_is_served_immutable(image_post, media_root):
+    from django.test import RequestFactory
+
+    from blog.views import serve_media
+
+    response = serve_media(
+        RequestFactory().get("/"), image_post.image.name,
+        document_root=media_root,
+    )
+    assert "immutable" in response["Cache-Control"], (
+        "Убедитесь, что файлы хранилища по хешу отдаются с заголовком "
+        "долгого кеширования."
+    )
+
+
+def test_dimensions_are_stored_at_upload(mixer: Mixer, user):
+    data = BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.new("RGB", (400, 200)).save(data, "JPEG", exif=exif)
+    post = mixer.blend(
+        "blog.Post", author=user,
+        image=SimpleUploadedFile("rotated.jpg", data.getvalue()),
+    )
+    post.refresh_from_db()
+    assert post.image_meta["pending"]
+    assert (post.image_width, post.image_height) == (200, 400), (
+        "Убедитесь, что размеры изображения сохраняются при загрузке с "
+        "учётом поворота из EXIF."
+    )
+    assert post.image_type == "image/jpeg"
+    assert post.image_size == len(data.getvalue())
+
+
+def test_cards_render_dimensions_without_file_access(
+        monkeypatch, user_client: Client, image_post
+):
+    from django.core.files.storage import FileSystemStorage
+
+    def forbidden(*args, **kwargs):
+        raise AssertionError("file opened during render")
+
+    monkeypatch.setattr(FileSystemStorage, "open", forbidden)
+    monkeypatch.setattr(FileSystemStorage, "size", forbidden)
+    content = user_client.get("/").content.decode()
+    img = BeautifulSoup(content, features="html.parser").find(
+        "picture"
+    ).find("img")
+    assert (img["width"], img["height"]) == ("640", "320"), (
+        "Убедитесь, что у изображения в карточке есть атрибуты width и "
+        "height из сохранённых размеров."
+    )
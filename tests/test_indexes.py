@@ -0,0 +1,89 @@
+import pytest
+from django.db import connection
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _feed_query_plans(client: Client, url: str):
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url)
+    assert response.status_code == 200
+    feed_sql = [
+        query["sql"] for query in captured.captured_queries
+        if query["sql"].startswith("SELECT")
+        and 'FROM "blog_post"' in query["sql"]
+        and 'ORDER BY "blog_post"."pub_date" DESC' in query["sql"]
+    ]
+    assert feed_sql, f"Не найден запрос ленты публикаций для `{url}`."
+    plans = []
+    with connection.cursor() as cursor:
+        for sql in feed_sql:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plans.append(" | ".join(row[-1] for row in cursor.fetchall()))
+    return plans
+
+
+@pytest.mark.skipif(
+    connection.vendor != "sqlite", reason="План запроса проверяется для SQLite"
+)
+@pytest.mark.parametrize(
+    ("url", "index_name"),
+    [
+        ("/", "post_feed_idx"),
+        ("/category/{category.slug}/", "post_category_feed_idx"),
+        ("/profile/{user.username}/", "post_author_feed_idx"),
+    ],
+    ids=["index", "category", "profile"],
+)
+def test_feed_uses_index_order(
+        url, index_name, unlogged_client, user, published_category,
+        many_posts_with_published_locations
+):
+    url = url.format(category=published_category, user=user)
+    for plan in _feed_query_plans(unlogged_client, url):
+        assert index_name in plan, (
+            f"Убедитесь, что запрос ленты `{url}` использует индекс "
+            f"`{index_name}`. План запроса: {plan}"
+        )
+        assert "TEMP B-TREE" not in plan, (
+            f"Убедитесь, что лента `{url}` сортируется по индексу, без "
+            f"временного B-дерева. План запроса: {plan}"
+        )
+
+
+def test_updated_at_follows_queryset_update(
+        mixer, post_with_published_location
+):
+    from blog.models import Comment, Post
+
+    post = post_with_published_location
+    before = post.updated_at
+    mixer.blend("blog.Comment", post=post)
+    post.refresh_from_db()
+    assert post.updated_at > before, (
+        "Убедитесь, что `updated_at` обновляется и при изменении записи "
+        "через `QuerySet.update()`."
+    )
+    assert Post.last_changed() == post.updated_at
+    assert Comment.last_changed() == Comment.objects.get().updated_at
+
+
+@pytest.mark.skipif(
+    connection.vendor != "sqlite", reason="План запроса проверяется для SQLite"
+)
+def test_last_changed_uses_index(post_with_published_location):
+    from blog.models import Post
+
+    with CaptureQueriesContext(connection) as captured:
+        Post.last_changed()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"EXPLAIN QUERY PLAN {captured.captured_queries[0]['sql']}"
+        )
+        plan = " | ".join(row[-1] for row in cursor.fetchall())
+    assert "updated_at" in plan and "TEMP B-TREE" not in plan, (
+        "Убедитесь, что `last_changed()` читает индекс по `updated_at`. "
+        f"План запроса: {plan}"
+    )
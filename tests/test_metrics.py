@@ -0,0 +1,124 @@
+import re
+import subprocess
+import sys
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test.client import Client
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def admin_client(client: Client):
+    admin = get_user_model().objects.create_superuser(
+        "admin", "admin@example.com", "password"
+    )
+    client.force_login(admin)
+    return client
+
+
+def _sample(text: str, name: str, **labels):
+    pairs = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(
+        rf"^{re.escape(name)}\{{{re.escape(pairs)}\}} (\S+)$", text, re.M
+    )
+    return float(match.group(1)) if match else None
+
+
+def test_metrics_are_admin_only(user_client: Client, admin_client: Client):
+    assert user_client.get("/admin/metrics/").status_code == 302, (
+        "Убедитесь, что метрики доступны только сотрудникам."
+    )
+    response = admin_client.get("/admin/metrics/")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+
+
+def test_request_metrics(
+        user_client: Client, admin_client: Client,
+        many_posts_with_published_locations
+):
+    for _ in range(3):
+        user_client.get("/")
+    text = admin_client.get("/admin/metrics/").content.decode()
+    assert _sample(
+        text, "blogicum_requests_total", status="200", view="blog:index"
+    ) == 3, (
+        "Убедитесь, что запросы считаются по имени маршрута и коду ответа."
+    )
+    name = "blogicum_request_duration_seconds"
+    assert _sample(text, f"{name}_count", view="blog:index") == 3
+    assert _sample(text, f"{name}_bucket", view="blog:index", le="+Inf") == 3
+    buckets = [
+        float(value) for value in re.findall(
+            rf'^{name}_bucket\{{view="blog:index",le="[^"]+"\}} (\S+)$',
+            text, re.M
+        )
+    ]
+    assert buckets == sorted(buckets), (
+        "Убедитесь, что корзины гистограммы накопительные."
+    )
+    assert _sample(
+        text, "blogicum_request_db_queries_sum", view="blog:index"
+    ) > 0
+
+
+def test_metrics_are_merged_across_workers(metrics_dir):
+    from core.metrics import REQUESTS, MetricsFile, render_metrics
+
+    metrics_dir.mkdir()
+    for pid in (1, 2):
+        worker = MetricsFile(metrics_dir / f"worker_{pid}.db")
+        worker.add(REQUESTS.updates("blog:index", 200, amount=pid))
+        worker.close()
+    assert _sample(
+        render_metrics(), "blogicum_requests_total",
+        status="200", view="blog:index"
+    ) == 3, (
+        "Убедитесь, что метрики складываются из файлов всех процессов."
+    )
+
+
+def test_metrics_file_grows(tmp_path):
+    from core.metrics import MetricsFile, read_file, sample_key
+
+    path = tmp_path / "worker.db"
+    worker = MetricsFile(path)
+    keys = [sample_key("test", (("n", str(i)),)) for i in range(5000)]
+    worker.add((key, 1) for key in keys)
+    worker.add([(keys[0], 2)])
+    worker.close()
+    values = dict(read_file(path))
+    assert len(values) == 5000
+    assert values[keys[0]] == 3
+
+    worker = MetricsFile(path)
+    worker.add([(keys[-1], 1)])
+    worker.close()
+    assert dict(read_file(path))[keys[-1]] == 2
+
+
+def test_dead_worker_files_are_merged(metrics_dir):
+    from core.metrics import (
+        REQUESTS, MetricsFile, current_file, render_metrics
+    )
+
+    dead_pid = int(subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True, check=True, text=True,
+    ).stdout)
+    metrics_dir.mkdir()
+    worker = MetricsFile(metrics_dir / f"worker_{dead_pid}.db")
+    worker.add(REQUESTS.updates("blog:index", 200, amount=2))
+    worker.close()
+    current_file().add(REQUESTS.updates("blog:index", 200))
+    assert not (metrics_dir / f"worker_{dead_pid}.db").exists(), (
+        "Убедитесь, что файлы завершившихся процессов сливаются при "
+        "старте воркера."
+    )
+    assert (metrics_dir / "aggregate.db").exists()
+    assert _sample(
+        render_metrics(), "blogicum_requests_total",
+        status="200", view="blog:index"
+    ) == 3, "Убедитесь, что слитые значения не теряются."
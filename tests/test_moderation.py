@@ -0,0 +1,187 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.test.client import Client
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def admin_client(client: Client):
+    admin = get_user_model().objects.create_superuser(
+        "admin", "admin@example.com", "password"
+    )
+    client.force_login(admin)
+    return client
+
+
+@pytest.fixture
+def spam_posts(mixer: Mixer, another_user, published_category):
+    return mixer.cycle(5).blend(
+        "blog.Post", author=another_user, is_published=True,
+        category=published_category,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+
+
+def _run_action(admin_client: Client, model: str, action: str, objects,
+                **data):
+    response = admin_client.post(f"/admin/blog/{model}/", {
+        "action": action,
+        helpers.ACTION_CHECKBOX_NAME: [obj.pk for obj in objects[:1]],
+        **data,
+    })
+    assert response.status_code == 302
+    from blog.jobs import run_pending_jobs
+    from blog.models import BackgroundJob
+
+    job = BackgroundJob.objects.latest("id")
+    assert job.status == BackgroundJob.PENDING, (
+        "Убедитесь, что массовое действие модерации ставится в очередь "
+        "фоновых задач, а не выполняется в запросе."
+    )
+    run_pending_jobs()
+    job.refresh_from_db()
+    assert job.status == BackgroundJob.DONE, job.error
+    return job
+
+
+def test_unpublish_author_posts_in_batches(
+        monkeypatch, admin_client: Client, unlogged_client: Client,
+        spam_posts, another_user
+):
+    monkeypatch.setattr("blog.moderation.MODERATION_BATCH_SIZE", 2)
+    assert len(unlogged_client.get("/").context["page_obj"]) == 5
+    job = _run_action(
+        admin_client, "post", "unpublish_author_posts", spam_posts
+    )
+    assert job.progress == 5
+    assert not another_user.posts.filter(is_published=True).exists()
+    assert len(unlogged_client.get("/").context["page_obj"]) == 0, (
+        "Убедитесь, что после массового снятия с публикации кеш ленты "
+        "сброшен."
+    )
+
+
+def test_reassign_category(
+        mixer: Mixer, admin_client: Client, spam_posts
+):
+    category = mixer.blend("blog.Category", is_published=True)
+    _run_action(
+        admin_client, "post", "reassign_category", spam_posts,
+        category=category.id,
+    )
+    from blog.models import Post
+
+    assert list(Post.objects.filter(
+        pk=spam_posts[0].pk
+    ).values_list("category_id", flat=True)) == [category.id]
+
+
+def test_reassign_category_requires_category(
+        admin_client: Client, spam_posts
+):
+    from blog.models import BackgroundJob
+
+    response = admin_client.post("/admin/blog/post/", {
+        "action": "reassign_category",
+        helpers.ACTION_CHECKBOX_NAME: [spam_posts[0].pk],
+        "category": "",
+    }, follow=True)
+    assert "Выберите новую категорию." in response.content.decode(), (
+        "Убедитесь, что перенос без выбранной категории завершается "
+        "сообщением об ошибке."
+    )
+    assert not BackgroundJob.objects.filter(
+        kind="reassign_category"
+    ).exists()
+
+
+def test_purge_author_comments(
+        mixer: Mixer, admin_client: Client, spam_posts, user, another_user
+):
+    post = spam_posts[0]
+    spam = mixer.cycle(3).blend("blog.Comment", post=post, author=another_user)
+    reply = mixer.blend(
+        "blog.Comment", post=post, author=user, parent=spam[0]
+    )
+    kept = mixer.blend("blog.Comment", post=post, author=user)
+    _run_action(admin_client, "comment", "purge_author_comments", spam)
+    post.refresh_from_db()
+    assert list(post.comments.values_list("id", flat=True)) == [kept.id], (
+        "Убедитесь, что удаляются все комментарии автора вместе с ответами "
+        "на них."
+    )
+    assert reply.id not in post.comments.values_list("id", flat=True)
+    assert post.comment_count == 1, (
+        "Убедитесь, что после массового удаления счётчики комментариев "
+        "пересчитываются."
+    )
+
+
+def test_purge_comments_deletes_batch_in_one_statement(
+        mixer: Mixer, spam_posts, user, another_user,
+        django_assert_max_num_queries
+):
+    from blog.moderation import purge_comments
+
+    post = spam_posts[0]
+    spam = mixer.blend("blog.Comment", post=post, author=another_user)
+    reply = mixer.blend("blog.Comment", post=post, author=user, parent=spam)
+    mixer.cycle(3).blend("blog.Comment", post=post, author=user, parent=reply)
+    kept = mixer.blend("blog.Comment", post=post, author=user)
+    with django_assert_max_num_queries(20) as captured:
+        assert purge_comments(author_ids=[another_user.id]) == 5
+    queries = [query["sql"] for query in captured.captured_queries]
+    assert sum(sql.startswith("DELETE") for sql in queries) == 1, (
+        "Убедитесь, что пачка комментариев с ветками ответов удаляется "
+        "одним запросом DELETE."
+    )
+    assert sum(
+        sql.startswith('UPDATE "blog_post"') for sql in queries
+    ) == 1, (
+        "Убедитесь, что счётчики комментариев пересчитываются одним "
+        "UPDATE на пачку."
+    )
+    post.refresh_from_db()
+    assert list(post.comments.values_list("id", flat=True)) == [kept.id]
+    assert post.comment_count == 1
+
+
+def test_purge_comments_invalidates_comment_pages(
+        mixer: Mixer, admin_client: Client, spam_posts, another_user
+):
+    from blog.cache import get_versions, version_key
+
+    post = spam_posts[0]
+    spam = mixer.cycle(2).blend("blog.Comment", post=post, author=another_user)
+    key = version_key("comments", post.id)
+    version = get_versions([key])[key]
+    _run_action(admin_client, "comment", "purge_author_comments", spam)
+    assert get_versions([key])[key] != version, (
+        "Убедитесь, что массовое удаление комментариев сбрасывает кеш "
+        "страниц комментариев публикации."
+    )
+
+
+def test_purge_comments_in_range(
+        mixer: Mixer, admin_client: Client, spam_posts, user
+):
+    from blog.models import Comment
+
+    old, recent = mixer.cycle(2).blend(
+        "blog.Comment", post=spam_posts[0], author=user
+    )
+    Comment.objects.filter(pk=old.pk).update(
+        created_at=timezone.now() - timedelta(days=10)
+    )
+    since = (timezone.now() - timedelta(days=1)).date().isoformat()
+    _run_action(
+        admin_client, "comment", "purge_comments_in_range", [old],
+        since=since,
+    )
+    assert list(Comment.objects.values_list("id", flat=True)) == [old.id]
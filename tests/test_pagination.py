@@ -0,0 +1,173 @@
+import json
+from collections import namedtuple
+from datetime import timedelta
+
+import pytest
+from django.template.loader import render_to_string
+from django.test.client import Client
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_encode
+from mixer.backend.django import Mixer
+
+from conftest import N_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def posts_with_equal_dates(mixer: Mixer, user, published_category):
+    pub_date = timezone.now() - timedelta(days=1)
+    return mixer.cycle(N_PER_PAGE * 2 + 5).blend(
+        "blog.Post",
+        author=user,
+        is_published=True,
+        category=published_category,
+        pub_date=pub_date,
+    )
+
+
+def _walk(client: Client, url: str, direction: str):
+    response = client.get(url)
+    page = response.context["page_obj"]
+    pages = [[post.id for post in page]]
+    while getattr(page, f"has_{direction}")():
+        param = "after" if direction == "next" else "before"
+        cursor = getattr(page, f"{direction}_cursor")
+        response = client.get(f"{url.split('?')[0]}?{param}={cursor}")
+        page = response.context["page_obj"]
+        pages.append([post.id for post in page])
+    return pages
+
+
+def test_keyset_walk(user_client: Client, posts_with_equal_dates):
+    pages = _walk(user_client, "/", "next")
+    ids = [post_id for page in pages for post_id in page]
+    assert sorted(ids) == sorted(post.id for post in posts_with_equal_dates), (
+        "Убедитесь, что курсорная пагинация по ссылкам `?after=` обходит "
+        "все публикации ленты без пропусков и повторов."
+    )
+    assert all(len(page) <= N_PER_PAGE for page in pages)
+
+    last_page = user_client.get(f"/?page={len(pages)}").context["page_obj"]
+    back_pages = _walk(
+        user_client, f"/?before={last_page.previous_cursor}", "previous"
+    )
+    assert back_pages[::-1] == pages[:-1], (
+        "Убедитесь, что курсорная пагинация по ссылкам `?before=` "
+        "возвращает те же страницы в обратном порядке."
+    )
+
+
+def test_keyset_bad_cursor(user_client: Client, posts_with_equal_dates):
+    response = user_client.get("/?after=broken")
+    assert response.status_code == 200
+    assert len(response.context["page_obj"]) == N_PER_PAGE
+
+
+@pytest.mark.parametrize("param", ["after", "before"])
+@pytest.mark.parametrize(
+    "values", [[None, 1], ["2020-01-01T00:00:00", None], {"a": 1}]
+)
+def test_keyset_cursor_with_nulls(
+        param, values, user_client: Client, posts_with_equal_dates
+):
+    cursor = urlsafe_base64_encode(json.dumps(values).encode())
+    response = user_client.get(f"/?{param}={cursor}")
+    assert response.status_code == 200, (
+        "Убедитесь, что курсор с null открывает первую страницу, а не "
+        "приводит к ошибке."
+    )
+    assert len(response.context["page_obj"]) == N_PER_PAGE
+
+
+def test_keyset_page_has_no_offset(
+        user_client: Client, posts_with_equal_dates,
+        django_assert_max_num_queries
+):
+    first = user_client.get("/").context["page_obj"]
+    url = f"/?after={first.next_cursor}"
+    with django_assert_max_num_queries(4) as captured:
+        user_client.get(url)
+    feed_sql = [
+        q["sql"] for q in captured.captured_queries if "blog_post" in q["sql"]
+    ]
+    assert feed_sql and not any("OFFSET" in sql for sql in feed_sql)
+    assert not any("COUNT(*)" in sql for sql in feed_sql)
+
+
+def _count_queries(captured):
+    return [
+        q["sql"] for q in captured.captured_queries if "COUNT(*)" in q["sql"]
+    ]
+
+
+def test_feed_count_is_cached(
+        mixer: Mixer, user, published_category, unlogged_client: Client,
+        posts_with_equal_dates, django_assert_max_num_queries
+):
+    first = unlogged_client.get("/").context["page_obj"]
+    with django_assert_max_num_queries(10) as captured:
+        unlogged_client.get("/?page=2")
+    assert not _count_queries(captured), (
+        "Убедитесь, что число публикаций в ленте берётся из кеша."
+    )
+    mixer.blend(
+        "blog.Post", author=user, is_published=True,
+        category=published_category,
+        pub_date=timezone.now() - timedelta(hours=1),
+    )
+    page = unlogged_client.get("/").context["page_obj"]
+    assert page.paginator.count == first.paginator.count + 1, (
+        "Убедитесь, что кеш числа публикаций сбрасывается при сохранении "
+        "публикации."
+    )
+
+
+def test_feed_count_is_capped(
+        monkeypatch, unlogged_client: Client, posts_with_equal_dates
+):
+    monkeypatch.setattr("blog.paginators.MAX_COUNTED_PAGES", 2)
+    page = unlogged_client.get("/?page=2").context["page_obj"]
+    assert page.paginator.count_capped
+    assert page.paginator.num_pages == 2
+    assert page.has_next() and page.next_cursor, (
+        "Убедитесь, что на последней посчитанной странице ленты доступен "
+        "переход дальше по курсору."
+    )
+
+
+FakePost = namedtuple("FakePost", ("id", "pub_date"))
+
+
+def _fake_posts(n_posts: int):
+    return [FakePost(1, timezone.now())] * n_posts
+
+
+def _render_paginator(posts: list, page_number: int):
+    from blog.paginators import PostPaginator
+
+    page = PostPaginator(posts, N_PER_PAGE).get_page(page_number)
+    return render_to_string(
+        "includes/paginator.html", {"page_obj": page}
+    )
+
+
+@pytest.mark.parametrize("page_number", [1, 2500, 50_000])
+def test_paginator_links_are_windowed(page_number):
+    html = _render_paginator(_fake_posts(N_PER_PAGE * 50_000), page_number)
+    assert html.count("<li") < 15, (
+        "Убедитесь, что пагинатор выводит ограниченное окно ссылок на "
+        "страницы, а не весь `page_range`."
+    )
+
+
+def test_paginator_links_do_not_grow_with_pages():
+    def link_count(n_pages):
+        return _render_paginator(
+            _fake_posts(N_PER_PAGE * n_pages), 5
+        ).count("<li")
+
+    assert link_count(10) == link_count(50_000), (
+        "Убедитесь, что число ссылок пагинатора не растёт вместе с "
+        "числом страниц."
+    )
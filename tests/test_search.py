@@ -0,0 +1,137 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test.client import Client
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def searchable_posts(mixer: Mixer, user, published_category):
+    pub_date = timezone.now() - timedelta(days=1)
+
+    def blend(title, text, **kwargs):
+        params = dict(
+            author=user, is_published=True, category=published_category,
+            pub_date=pub_date,
+        )
+        params.update(kwargs)
+        return mixer.blend(
+            "blog.Post", title=title, text=text, **params
+        )
+
+    return {
+        "strong": blend("Кофе", "Кофе, кофе и ещё раз кофе."),
+        "weak": blend("Заметки", "Однажды утром я выпил кофе и ушёл."),
+        "hidden": blend("Кофе", "Кофе", is_published=False),
+        "future": blend(
+            "Кофе", "Кофе", pub_date=timezone.now() + timedelta(days=1)
+        ),
+        "other": blend("Чай", "Про чай."),
+    }
+
+
+def _search_ids(client: Client, query: str):
+    response = client.get("/search/", {"q": query})
+    assert response.status_code == 200
+    return [post.id for post in response.context["page_obj"]]
+
+
+def test_search_is_ranked_and_visible_only(
+        user_client: Client, searchable_posts
+):
+    ids = _search_ids(user_client, "КОФЕ")
+    assert ids == [
+        searchable_posts["strong"].id, searchable_posts["weak"].id
+    ], (
+        "Убедитесь, что поиск находит только видимые публикации и "
+        "упорядочивает их по релевантности."
+    )
+    assert _search_ids(user_client, 'кофе" (*') == ids
+    assert _search_ids(user_client, "") == []
+
+
+def test_search_index_follows_posts(user_client: Client, searchable_posts):
+    post = searchable_posts["other"]
+    post.text = "Теперь здесь про какао."
+    post.save()
+    assert _search_ids(user_client, "какао") == [post.id]
+    assert _search_ids(user_client, "чай") == [post.id]
+    post.delete()
+    assert _search_ids(user_client, "какао") == [], (
+        "Убедитесь, что индекс поиска обновляется при изменении и "
+        "удалении публикаций."
+    )
+
+
+def test_search_does_not_scan_with_like(
+        user_client: Client, searchable_posts, django_assert_max_num_queries
+):
+    with django_assert_max_num_queries(5) as captured:
+        _search_ids(user_client, "кофе")
+    assert not any(
+        "LIKE" in query["sql"] for query in captured.captured_queries
+    ), "Убедитесь, что поиск использует полнотекстовый индекс."
+    matched = [
+        query["sql"] for query in captured.captured_queries
+        if "MATCH" in query["sql"]
+    ]
+    assert matched and all(
+        sql.count("MATCH") == 1 and "JOIN" in sql for sql in matched
+    ), (
+        "Убедитесь, что индекс присоединяется к публикациям одним JOIN, "
+        "а не проверяется подзапросом для каждой строки."
+    )
+
+
+def test_admin_search_uses_index(client: Client, searchable_posts):
+    admin = get_user_model().objects.create_superuser(
+        "admin", "admin@example.com", "password"
+    )
+    client.force_login(admin)
+    response = client.get("/admin/blog/post/", {"q": "кофе"})
+    assert response.status_code == 200
+    found = {post.id for post in response.context["cl"].result_list}
+    assert found == {
+        searchable_posts[key].id
+        for key in ("strong", "weak", "hidden", "future")
+    }
+
+
+def test_rebuild_command_resumes(
+        monkeypatch, capsys, user_client: Client, searchable_posts
+):
+    from blog.management.commands import rebuild_search_index
+    from blog.models import SearchIndexState
+    from blog.search import clear_index, index_posts
+
+    clear_index()
+    assert _search_ids(user_client, "кофе") == []
+
+    def interrupt_after_first_batch(rows):
+        index_posts(rows)
+        monkeypatch.setattr(
+            rebuild_search_index, "index_posts", lambda rows: 1 / 0
+        )
+
+    monkeypatch.setattr(
+        rebuild_search_index, "index_posts", interrupt_after_first_batch
+    )
+    with pytest.raises(ZeroDivisionError):
+        call_command("rebuild_search_index", batch_size=2)
+    first_batch = sorted(post.id for post in searchable_posts.values())[:2]
+    assert SearchIndexState.objects.get().last_pk == first_batch[-1], (
+        "Убедитесь, что команда перестройки индекса сохраняет прогресс "
+        "после каждой пачки."
+    )
+
+    monkeypatch.setattr(rebuild_search_index, "index_posts", index_posts)
+    call_command("rebuild_search_index", batch_size=2)
+    assert "строк/с" in capsys.readouterr().out
+    assert _search_ids(user_client, "кофе") == [
+        searchable_posts["strong"].id, searchable_posts["weak"].id
+    ], "Убедитесь, что прерванная перестройка индекса продолжается."
@@ -0,0 +1,59 @@
+import json
+import logging
+import re
+
+import pytest
+from django.test.client import Client
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def timing_log(caplog):
+    logger = logging.getLogger("core.middleware")
+    logger.addHandler(caplog.handler)
+    caplog.set_level(logging.INFO, logger="core.middleware")
+    yield caplog
+    logger.removeHandler(caplog.handler)
+
+
+def _metrics(header: str):
+    parts = re.split(r",\s*(?=\w+;)", header)
+    return {part.split(";")[0]: part for part in parts}
+
+
+def test_server_timing_header(
+        user_client: Client, many_posts_with_published_locations,
+        django_assert_max_num_queries
+):
+    with django_assert_max_num_queries(50) as captured:
+        response = user_client.get("/")
+    metrics = _metrics(response["Server-Timing"])
+    assert {"db", "tpl", "cache", "total"} <= set(metrics), (
+        "Убедитесь, что заголовок `Server-Timing` содержит время базы "
+        "данных, шаблонов, кеша и всего запроса."
+    )
+    queries = int(re.search(r'"(\d+) queries"', metrics["db"]).group(1))
+    assert queries == len(captured.captured_queries), (
+        "Убедитесь, что в `Server-Timing` указано число SQL-запросов."
+    )
+    assert re.search(r"\d+ hits, [1-9]\d* misses", metrics["cache"])
+
+    metrics = _metrics(user_client.get("/")["Server-Timing"])
+    assert re.search(r"[1-9]\d* hits", metrics["cache"]), (
+        "Убедитесь, что попадания в кеш учитываются в `Server-Timing`."
+    )
+
+
+def test_timing_log_line(
+        user_client: Client, post_with_published_location, timing_log
+):
+    user_client.get(f"/posts/{post_with_published_location.id}/")
+    records = [json.loads(r.getMessage()) for r in timing_log.records]
+    assert records and records[-1]["view"] == "blog:post_detail", (
+        "Убедитесь, что строка лога с замерами запроса содержит имя "
+        "представления."
+    )
+    assert records[-1]["status"] == 200
+    assert records[-1]["db_queries"] > 0
+    assert records[-1]["template_ms"] > 0
@@ -0,0 +1,132 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.client import Client
+from django.utils import timezone
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+def _png(size):
+    data = BytesIO()
+    Image.new("1", size).save(data, "PNG")
+    return data.getvalue()
+
+
+def _create(client: Client, category, content: bytes):
+    return client.post("/posts/create/", {
+        "title": "Фото",
+        "text": "Текст",
+        "pub_date": timezone.now().strftime("%Y-%m-%d %H:%M"),
+        "category": category.id,
+        "is_published": True,
+        "image": SimpleUploadedFile("photo.png", content),
+    })
+
+
+def test_oversized_upload_is_rejected(
+        settings, user, user_client: Client, published_category
+):
+    settings.MAX_IMAGE_UPLOAD_SIZE = 1024
+    response = _create(user_client, published_category, b"x" * 200_000)
+    form = response.context["form"]
+    assert "image" in form.errors and "Файл больше" in form.errors["image"][
+        0
+    ], (
+        "Убедитесь, что загрузка больше MAX_IMAGE_UPLOAD_SIZE отклоняется "
+        "с понятной ошибкой."
+    )
+    assert not user.posts.exists()
+
+
+def test_upload_limit_is_scoped_to_post_form(
+        settings, user, published_category
+):
+    from django.contrib.auth import get_user_model
+
+    settings.MAX_IMAGE_UPLOAD_SIZE = 64
+    admin = get_user_model().objects.create_superuser(
+        "admin", "admin@example.com", "password"
+    )
+    client = Client(enforce_csrf_checks=True)
+    client.force_login(admin)
+    assert _create(client, published_category, b"x").status_code == 403, (
+        "Убедитесь, что форма публикации по-прежнему проверяет CSRF."
+    )
+    client = Client()
+    client.force_login(admin)
+    client.post("/admin/blog/post/add/", {
+        "image": SimpleUploadedFile("photo.png", _png((100, 100))),
+        "title": "Из админки",
+        "text": "Текст",
+        "pub_date_0": timezone.now().strftime("%Y-%m-%d"),
+        "pub_date_1": timezone.now().strftime("%H:%M:%S"),
+        "author": user.id,
+        "category": published_category.id,
+        "is_published": True,
+    })
+    post = user.posts.get()
+    assert post.title == "Из админки" and post.image, (
+        "Убедитесь, что ограничение загрузок действует только в форме "
+        "публикации и не обрывает запросы админки."
+    )
+
+
+def test_oversized_upload_is_aborted_early(settings):
+    from django.test import RequestFactory
+
+    from blog.uploads import LimitedUploadHandler, uploaded_files
+
+    settings.MAX_IMAGE_UPLOAD_SIZE = 1024
+    body_size = 1024 * 1024
+    request = RequestFactory().post("/posts/create/", {
+        "title": "Фото",
+        "image": SimpleUploadedFile("photo.png", b"x" * body_size),
+    })
+    request.upload_handlers = [LimitedUploadHandler(request)]
+    assert request.POST["title"] == "Фото"
+    assert "image" not in request.FILES
+    assert request._stream.remaining > body_size // 2, (
+        "Убедитесь, что приём слишком большой загрузки обрывается, не "
+        "дочитывая тело запроса."
+    )
+    assert uploaded_files(request)["image"].upload_error.startswith(
+        "Файл больше"
+    )
+
+
+def test_too_many_pixels_is_rejected(
+        settings, user, user_client: Client, published_category
+):
+    settings.MAX_IMAGE_PIXELS = 100 * 100
+    response = _create(user_client, published_category, _png((500, 500)))
+    assert "пикселей" in response.context["form"].errors["image"][0], (
+        "Убедитесь, что изображение с числом пикселей больше "
+        "MAX_IMAGE_PIXELS отклоняется до декодирования."
+    )
+
+
+def test_upload_is_streamed_to_temp_file(
+        monkeypatch, user, user_client: Client, published_category
+):
+    from blog import uploads
+
+    seen = []
+    original = uploads.validate_image_upload
+
+    def remember(file):
+        seen.append(file.temporary_file_path())
+        return original(file)
+
+    monkeypatch.setattr("blog.forms.validate_image_upload", remember)
+    response = _create(user_client, published_category, _png((50, 50)))
+    assert response.status_code == 302
+    assert seen and user.posts.get().image